@@ -0,0 +1,452 @@
+"""
+Agente ReAct assíncrono, a partir do `Agent` do notebook fastcamp_nova_implementacao.ipynb.
+
+O `Agent` do notebook chama `client.chat.completions.create` de forma síncrona e
+atende uma conversa por vez. Aqui:
+
+- `AsyncAgent` usa um cliente assíncrono (ex.: `groq.AsyncGroq`) e pode atender muitas
+  conversas ao mesmo tempo no mesmo event loop;
+- o estado de cada conversa (mensagens, iterações, resposta) fica num `Conversation`,
+  e não no agente, então um agente é compartilhado entre todas as conversas;
+- um `asyncio.Semaphore` limita quantas chamadas ao LLM ficam em andamento ao mesmo tempo;
+- com `max_prompt_tokens`, o histórico de cada conversa fica numa `ConversationMemory`
+  limitada (ver memory.py) e `conversation.prompt_tokens` registra o tamanho estimado do
+  prompt de cada chamada;
+- as ferramentas ficam num `ToolRegistry` (ver tools.py) com cache LRU compartilhado
+  entre as conversas: `get_menu` vale por `MENU_TTL` segundos, e `calculate` e
+  `get_planet_mass` são puras e ficam no cache até serem removidas;
+- `calculate` usa o avaliador de calculator.py no lugar de `eval`;
+- todas as Actions de uma resposta são executadas (não só a primeira): as ferramentas
+  rodam em threads (`tool_executor`, ou o executor padrão do event loop), nunca no
+  próprio event loop, e ao mesmo tempo quando são várias; as Observations voltam juntas,
+  na ordem das Actions, num único prompt.
+
+`FakeLLMClient` imita a interface do cliente e devolve respostas roteirizadas, com
+latência simulada, para testes e benchmarks sem rede.
+
+Uso:
+
+    from groq import AsyncGroq
+
+    agent = AsyncAgent(AsyncGroq(api_key=...), max_concurrency=50)
+    conversation = await agent.run_loop("I want a Cheese pizza and a Coke to go.")
+    print(conversation.answer)
+"""
+
+import asyncio
+import json
+import re
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Sequence
+
+import calculator
+from memory import ConversationMemory, Summarizer
+from tools import ToolRegistry, lower, registry_from_dict
+
+MODEL = "llama-3.3-70b-versatile"
+MENU_TTL = 60.0
+
+SYSTEM_PROMPT = """
+You run in a loop of Thought, Action, PAUSE, Observation.
+At the end of the loop you output an Answer.
+Use Thought to describe your thoughts about the question you have been asked.
+Use Action to run one of the actions available to you - then return PAUSE.
+If you need several actions that do not depend on each other, write one Action line for each before PAUSE.
+Observation will be the result of running those actions, one Observation line per Action, in the same order.
+
+Your goal is to act as a cashier for a Pizza place.
+Rules:
+1. You must always retrieve the current menu prices before calculating.
+2. If the customer eats at the restaurant (dine-in), you MUST add a 10% service fee to the total.
+3. If the order is for takeout/delivery, there is NO service fee.
+4. Final Answer must state the items ordered and the final total price.
+
+Your available actions are:
+
+get_menu:
+e.g. get_menu
+Returns a JSON object containing the available pizzas and sodas with their respective prices.
+
+calculate:
+e.g. calculate: 12 + 3
+Runs a calculation and returns the number. Use Python syntax.
+
+Example session 1:
+
+Question: I want one Pepperoni pizza and a Coke to go.
+Thought: I need to check the prices for Pepperoni and Coke.
+Action: get_menu
+PAUSE
+
+You will be called again with this:
+
+Observation: {"pizzas": {"Pepperoni": 15.00, "Cheese": 12.00}, "sodas": {"Coke": 3.00, "Sprite": 3.00}}
+
+Thought: Pepperoni is 15.00. Coke is 3.00. The customer said "to go", so there is no service fee. I need to sum the prices.
+Action: calculate: 15 + 3
+PAUSE
+
+You will be called again with this:
+
+Observation: 18.0
+
+Thought: The calculation is complete. I have the final total.
+Answer: You ordered a Pepperoni pizza and a Coke. The total is $18.00.
+
+Example session 2:
+
+Question: I'll have a Cheese pizza and a Sprite. I'm eating here.
+Thought: I need to check prices.
+Action: get_menu
+PAUSE
+
+You will be called again with this:
+
+Observation: {"pizzas": {"Pepperoni": 15.00, "Cheese": 12.00}, "sodas": {"Coke": 3.00, "Sprite": 3.00}}
+
+Thought: Cheese is 12.00. Sprite is 3.00. The customer is "eating here", so I must add 10% to the total. Calculation is (12 + 3) * 1.10.
+Action: calculate: (12 + 3) * 1.10
+PAUSE
+
+You will be called again with this:
+
+Observation: 16.5
+
+Thought: The total includes the service fee.
+Answer: You ordered a Cheese pizza and a Sprite for dine-in. The total is $16.50.
+
+Now it's your turn:
+""".strip()
+
+# 1. ([a-z_]+) -> nome da ferramenta
+# 2. (?::\s*(.+))? -> opcional: ':' seguido de espaço e o argumento
+ACTION_RE = re.compile(r"Action: ([a-z_]+)(?::\s*(.+))?", re.IGNORECASE)
+
+
+# Tools (as mesmas do notebook)
+
+def get_menu() -> str:
+    menu_data = {
+        "pizzas": {
+            "Pepperoni": 15.00,
+            "Cheese": 12.00,
+        },
+        "sodas": {
+            "Coke": 3.00,
+            "Sprite": 3.00,
+        },
+    }
+    return json.dumps(menu_data)
+
+
+def calculate(expression: str) -> str:
+    try:
+        result = calculator.evaluate(expression)
+
+        return str(result)
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+# Do notebook fastcamp_original.ipynb.
+def get_planet_mass(planet) -> float:
+
+    planet = planet.lower()
+
+    if planet == "earth":
+        return 5.972e24
+    elif planet == "mars":
+        return 0.642e24
+    elif planet == "jupiter":
+        return 1.899e27
+    elif planet == "saturn":
+        return 5.688e26
+    elif planet == "uranus":
+        return 8.686e25
+    elif planet == "neptune":
+        return 1.024e26
+    elif planet == "mercury":
+        return 0.33e24
+    elif planet == "venus":
+        return 4.87e24
+    else:
+        return 0.0
+
+
+# Registro padrão, compartilhado por todos os agentes que não recebem outro.
+TOOLS = ToolRegistry(maxsize=4096)
+TOOLS.register("get_menu", get_menu, cacheable=True, ttl=MENU_TTL)
+TOOLS.register("calculate", calculate, cacheable=True, normalize=calculator.normalize)
+TOOLS.register("get_planet_mass", get_planet_mass, cacheable=True, normalize=lower)
+
+
+# Estado de uma conversa: memória com o histórico enviado ao LLM, iterações feitas, a resposta
+# final e os tokens estimados do prompt de cada chamada.
+@dataclass
+class Conversation:
+    memory: ConversationMemory = field(default_factory=ConversationMemory)
+    iterations: int = 0
+    answer: str | None = None
+    prompt_tokens: list[int] = field(default_factory=list)
+
+    @property
+    def messages(self) -> list[dict[str, str]]:
+        return self.memory.messages()
+
+
+class AsyncAgent:
+
+    def __init__(
+        self,
+        client: Any,
+        system: str | None = SYSTEM_PROMPT,
+        model: str = MODEL,
+        tools: ToolRegistry | dict[str, Callable[..., Any]] | None = None,
+        max_concurrency: int = 100,
+        max_prompt_tokens: int | None = None,
+        keep_recent: int = 6,
+        summarizer: Summarizer | None = None,
+        tool_executor: Executor | None = None,
+        verbose: bool = False,
+    ) -> None:
+        self.client = client
+        self.system = system
+        self.model = model
+        if tools is None:
+            tools = TOOLS
+        elif isinstance(tools, dict):
+            tools = registry_from_dict(tools)
+        self.tools = tools
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_prompt_tokens = max_prompt_tokens
+        self.keep_recent = keep_recent
+        self.summarizer = summarizer
+        self.tool_executor = tool_executor
+        self.verbose = verbose
+
+    def new_conversation(self) -> Conversation:
+        memory = ConversationMemory(self.system, self.max_prompt_tokens, self.keep_recent, self.summarizer)
+        return Conversation(memory)
+
+    # Registra a mensagem do usuário, chama o LLM e registra a resposta (o __call__ do notebook).
+    async def __call__(self, conversation: Conversation, message: str | None = "") -> str:
+        if message is not None:
+            conversation.memory.append({"role": "user", "content": message})
+
+        result = await self.execute(conversation)
+
+        conversation.memory.append({"role": "assistant", "content": result})
+        return result
+
+    # Ajusta a memória ao orçamento de tokens antes de montar o prompt.
+    async def execute(self, conversation: Conversation) -> str:
+        memory = conversation.memory
+        await memory.fit()
+        conversation.prompt_tokens.append(memory.tokens)
+        messages = memory.messages()
+        async with self.semaphore:
+            completion = await self.client.chat.completions.create(
+                messages=messages,
+                model=self.model,
+            )
+        return completion.choices[0].message.content
+
+    # Executa a ferramenta pedida na Action (pelo cache do registro) e devolve o texto da Observation.
+    def run_tool(self, chosen_tool: str, arg: str | None) -> str:
+        if chosen_tool not in self.tools:
+            return "Observation: Tool not found"
+        result_tool = self.tools.run(chosen_tool, arg)
+        return f"Observation: {result_tool}"
+
+    # Executa as Actions de uma resposta e junta as Observations na ordem das Actions.
+    # As ferramentas são síncronas e podem bloquear, então rodam sempre em threads (mesmo
+    # uma só), para não travar as outras conversas do event loop; várias rodam ao mesmo tempo.
+    async def run_tools(self, actions: list[tuple[str, str | None]]) -> str:
+        loop = asyncio.get_running_loop()
+        observations = await asyncio.gather(
+            *(loop.run_in_executor(self.tool_executor, self.run_tool, tool, arg) for tool, arg in actions)
+        )
+        return "\n".join(observations)
+
+    # Loop Thought/Action/PAUSE/Observation de uma conversa, como o Agent.loop do notebook.
+    # Retorna a conversa; conversation.answer fica com a última resposta que contém "Answer".
+    async def run_loop(
+        self,
+        query: str,
+        max_iterations: int = 10,
+        conversation: Conversation | None = None,
+    ) -> Conversation:
+        if conversation is None:
+            conversation = self.new_conversation()
+        next_prompt = query
+
+        while conversation.iterations < max_iterations:
+            conversation.iterations += 1
+            result = await self(conversation, next_prompt)
+            if self.verbose:
+                print(f"--- Iteração {conversation.iterations} ---")
+                print(result)
+
+            if "PAUSE" in result and "Action" in result:
+                actions = [match.groups() for match in ACTION_RE.finditer(result)]
+                if not actions:
+                    if self.verbose:
+                        print("Error: Could not parse Action from agent response.")
+                    break
+                next_prompt = await self.run_tools(actions)
+                if self.verbose:
+                    print(next_prompt)
+                continue
+
+            if "Answer" in result:
+                conversation.answer = result
+                break
+
+        return conversation
+
+
+# Cliente falso com a mesma interface usada pelo agente (client.chat.completions.create).
+# `script` é a lista de respostas de uma conversa, devolvidas em ordem conforme o número de
+# respostas do assistente já presentes nas mensagens; assim o mesmo cliente atende várias
+# conversas ao mesmo tempo. Também pode ser uma função que recebe as mensagens.
+class FakeLLMClient:
+
+    def __init__(self, script: Sequence[str] | Callable[[list[dict[str, str]]], str], latency: float = 0.0) -> None:
+        self.script = script
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages: list[dict[str, str]], model: str) -> Any:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if callable(self.script):
+            content = self.script(messages)
+        else:
+            turn = sum(1 for message in messages if message["role"] == "assistant")
+            content = self.script[min(turn, len(self.script) - 1)]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+# Sessão de exemplo do system prompt (Cheese + Sprite, dine-in), usada nos testes e no benchmark.
+PIZZA_SCRIPT = (
+    "Thought: I need to check prices.\nAction: get_menu\nPAUSE",
+    "Thought: Cheese is 12.00. Sprite is 3.00. Dine-in, so add 10%.\nAction: calculate: (12 + 3) * 1.10\nPAUSE",
+    "Thought: The total includes the service fee.\n"
+    "Answer: You ordered a Cheese pizza and a Sprite for dine-in. The total is $16.50.",
+)
+
+
+async def _self_check() -> None:
+    client = FakeLLMClient(PIZZA_SCRIPT, latency=0.01)
+    agent = AsyncAgent(client, max_concurrency=5)
+
+    conversation = await agent.run_loop("I'll have a Cheese pizza and a Sprite. I'm eating here.")
+    assert conversation.answer.endswith("The total is $16.50.")
+    assert conversation.iterations == 3
+    observations = [m["content"] for m in conversation.messages if m["content"].startswith("Observation:")]
+    assert observations == [f"Observation: {get_menu()}", f"Observation: {calculate('(12 + 3) * 1.10')}"]
+
+    # Conversas independentes em paralelo, limitadas pelo semáforo.
+    client.calls = 0
+    conversations = await asyncio.gather(*(agent.run_loop(f"order {index}") for index in range(50)))
+    assert all(c.answer and c.iterations == 3 for c in conversations)
+    assert len({id(c.memory) for c in conversations}) == 50
+    assert all(len(c.prompt_tokens) == 3 and c.prompt_tokens == sorted(c.prompt_tokens) for c in conversations)
+    assert client.calls == 150 and client.max_in_flight == 5
+
+    # O cache do registro é compartilhado: as 50 conversas acima reaproveitam o cardápio e a conta.
+    stats = TOOLS.cache.stats()
+    assert stats["size"] == 2 and stats["misses"] == 2 and stats["hits"] == 100
+
+    planets = AsyncAgent(
+        FakeLLMClient(["Action: get_planet_mass: Earth\nPAUSE", "Action: get_planet_mass:  EARTH \nPAUSE", "Answer: 5.972e24"])
+    )
+    conversation = await planets.run_loop("What is the mass of Earth?")
+    assert [m["content"] for m in conversation.messages[3::2]] == ["Observation: 5.972e+24"] * 2
+    assert TOOLS.cache.stats()["hits"] == 101
+    assert get_planet_mass("Pluto") == 0.0
+
+    # Várias Actions na mesma resposta: rodam juntas e voltam num único prompt, em ordem.
+    import threading
+    import time
+
+    # Conta quantas chamadas ficam em andamento ao mesmo tempo (em vez de medir o tempo total).
+    tool_calls = []
+    in_flight = [0, 0]  # [atuais, máximo]
+    lock = threading.Lock()
+
+    def slow_mass(planet: str) -> float:
+        with lock:
+            tool_calls.append(planet)
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return get_planet_mass(planet)
+
+    slow = ToolRegistry()
+    slow.register("get_planet_mass", slow_mass)
+    slow.register("calculate", calculate)
+    multi = AsyncAgent(
+        FakeLLMClient(
+            [
+                "Thought: I need both masses.\nAction: get_planet_mass: Earth\nAction: get_planet_mass: Mars\n"
+                "Action: get_planet_mass: Pluto\nAction: get_weather: Recife\nPAUSE",
+                "Action: calculate: 5.972e24 + 0.642e24\nPAUSE",
+                "Answer: 6.614e+24",
+            ]
+        ),
+        tools=slow,
+    )
+    conversation = await multi.run_loop("What is the mass of Earth plus Mars?")
+    assert conversation.iterations == 3 and conversation.answer == "Answer: 6.614e+24"
+    assert conversation.messages[3]["content"] == (
+        "Observation: 5.972e+24\nObservation: 6.42e+23\nObservation: 0.0\nObservation: Tool not found"
+    )
+    assert sorted(tool_calls) == ["Earth", "Mars", "Pluto"] and in_flight[1] == 3, in_flight
+
+    # Uma Action só também roda fora do event loop: a ferramenta espera um evento que só
+    # o event loop pode disparar enquanto ela está em andamento.
+    started, released = threading.Event(), threading.Event()
+
+    def waiting_mass(planet: str) -> float:
+        started.set()
+        if not released.wait(timeout=2):
+            raise AssertionError("a single tool call blocked the event loop")
+        return get_planet_mass(planet)
+
+    async def release() -> None:
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        released.set()
+
+    waiting = ToolRegistry()
+    waiting.register("get_planet_mass", waiting_mass)
+    single = AsyncAgent(FakeLLMClient(["Action: get_planet_mass: Earth\nPAUSE", "Answer: 5.972e+24"]), tools=waiting)
+    conversation, _ = await asyncio.gather(single.run_loop("Mass of Earth?"), release())
+    assert conversation.messages[3]["content"] == "Observation: 5.972e+24"
+
+    # Ferramenta desconhecida e Action sem formato reconhecido.
+    unknown = AsyncAgent(FakeLLMClient(["Action: get_weather: Recife\nPAUSE", "Answer: sorry"]))
+    conversation = await unknown.run_loop("weather?")
+    assert conversation.messages[3]["content"] == "Observation: Tool not found" and conversation.answer == "Answer: sorry"
+    broken = await AsyncAgent(FakeLLMClient(["Action PAUSE"])).run_loop("?")
+    assert broken.iterations == 1 and broken.answer is None
+
+
+if __name__ == "__main__":
+    asyncio.run(_self_check())
+    print("agent checks passed")
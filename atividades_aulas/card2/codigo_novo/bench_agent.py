@@ -0,0 +1,53 @@
+"""
+Benchmark do AsyncAgent com muitas conversas simultâneas.
+
+Roda `--conversations` conversas ao mesmo tempo contra o `FakeLLMClient`, com
+`--latency` segundos de latência simulada por chamada ao LLM (cada conversa do roteiro
+faz 3 chamadas), para cada limite de concorrência em `--concurrency`.
+
+A linha "sequential" é o tempo de uma conversa vezes o número de conversas: o que o
+`Agent.loop` síncrono do notebook levaria atendendo uma conversa por vez.
+
+Uso:
+    python bench_agent.py
+    python bench_agent.py --conversations 5000 --latency 0.2 --concurrency 100 1000 5000
+"""
+
+import argparse
+import asyncio
+import time
+
+from agent import PIZZA_SCRIPT, AsyncAgent, FakeLLMClient
+
+
+async def run(conversations: int, latency: float, concurrency: int) -> tuple[float, int]:
+    client = FakeLLMClient(PIZZA_SCRIPT, latency=latency)
+    agent = AsyncAgent(client, max_concurrency=concurrency)
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(agent.run_loop(f"Order {index}: a Cheese pizza and a Sprite, eating here.") for index in range(conversations))
+    )
+    elapsed = time.perf_counter() - start
+    assert all(conversation.answer for conversation in results), "every conversation should finish"
+    return elapsed, client.max_in_flight
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    single, _ = asyncio.run(run(1, args.latency, 1))
+    print(f"conversations={args.conversations} latency={args.latency}s llm_calls={args.conversations * 3}")
+    print(f"{'mode':<18} {'seconds':>9} {'conv/s':>10} {'in flight':>10}")
+    sequential = single * args.conversations
+    print(f"{'sequential':<18} {sequential:>9.2f} {args.conversations / sequential:>10.1f} {1:>10}")
+    for concurrency in args.concurrency:
+        elapsed, in_flight = asyncio.run(run(args.conversations, args.latency, concurrency))
+        print(f"{f'async (max {concurrency})':<18} {elapsed:>9.2f} {args.conversations / elapsed:>10.1f} {in_flight:>10}")
+
+
+if __name__ == "__main__":
+    main()
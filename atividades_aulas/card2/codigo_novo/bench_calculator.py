@@ -0,0 +1,66 @@
+"""
+Benchmark do avaliador de calculator.py contra `eval`.
+
+Mede quantas expressões por segundo cada forma avalia, com expressões típicas do
+caixa da pizzaria (ex.: `(12 + 3) * 1.10`):
+
+- `eval`: como a `calculate` do notebook, com `{"__builtins__": None}`;
+- `evaluate (cold)`: o avaliador sem cache (analisa, valida e compila toda vez);
+- `evaluate (cached)`: o avaliador com o código compilado no cache, como numa conversa
+  em que o LLM repete as mesmas contas.
+
+Uso:
+    python bench_calculator.py
+    python bench_calculator.py --number 200000 --repeat 7
+"""
+
+import argparse
+import timeit
+
+import calculator
+
+EXPRESSIONS = [
+    "(12 + 3) * 1.10",
+    "15 + 3",
+    "12 + 3",
+    "(15 + 12 + 3 + 3) * 1.10",
+    "2 * 15 + 2 * 3",
+    "(3 * 12 + 2 * 3) * 1.1",
+    "5.972e24 * 2",
+]
+
+
+def run_eval() -> None:
+    for expression in EXPRESSIONS:
+        eval(expression.strip(), {"__builtins__": None})
+
+
+def run_cold() -> None:
+    for expression in EXPRESSIONS:
+        calculator.compile_expression.cache_clear()
+        calculator.evaluate(expression)
+
+
+def run_cached() -> None:
+    for expression in EXPRESSIONS:
+        calculator.evaluate(expression)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for expression in EXPRESSIONS:
+        assert calculator.evaluate(expression) == eval(expression, {"__builtins__": None}), expression
+
+    print(f"{'mode':<18} {'expr/s':>12} {'us/expr':>9}")
+    for name, func in [("eval", run_eval), ("evaluate (cold)", run_cold), ("evaluate (cached)", run_cached)]:
+        best = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        rate = args.number * len(EXPRESSIONS) / best
+        print(f"{name:<18} {rate:>12,.0f} {1e6 / rate:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Avaliador de expressões aritméticas para a ferramenta `calculate` do agente.
+
+Os notebooks usam `eval` na expressão que vem do LLM: sem restrição no original e com
+`{"__builtins__": None}` no novo, o que ainda deixa passar atributos, chamadas e
+`9 ** 9 ** 9`. Além disso, cada chamada analisa e compila o texto de novo.
+
+Aqui a expressão é analisada com `ast` e só são aceitos:
+
+- números (int e float) e os sinais unários + e -;
+- os operadores + - * / ** % e parênteses.
+
+Os limites são `MAX_EXPRESSION_LENGTH` caracteres, expoentes de até `MAX_EXPONENT`
+(em valor absoluto) e potências inteiras de até `MAX_RESULT_BITS` bits, estimados antes
+de calcular, para que potências aninhadas como `((9 ** 99) ** 99) ** 99` não passem.
+Base negativa com expoente fracionário (resultado complexo) também é recusada. Essas
+verificações de potência são feitas durante a avaliação. Qualquer outra coisa levanta
+`UnsafeExpression`.
+
+A árvore validada é compilada uma vez e o código fica num cache LRU pelo texto
+normalizado (sem os espaços que não separam números ou nomes), então "12+3" e
+"12 + 3" usam o mesmo código compilado, mas "1 2" continua inválido.
+
+Uso:
+
+    evaluate("(12 + 3) * 1.10")   # 16.5
+"""
+
+import ast
+import operator
+import re
+from functools import lru_cache
+from types import CodeType
+
+MAX_EXPRESSION_LENGTH = 200
+MAX_EXPONENT = 100
+MAX_RESULT_BITS = 4096
+CACHE_SIZE = 4096
+
+_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod)
+_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+# Espaços entre dois caracteres de número/nome viram um espaço; os demais são removidos.
+_SEPARATOR_RE = re.compile(r"(?<=[\w.])\s+(?=[\w.])")
+_SPACE_RE = re.compile(r"(?<![\w.])\s+|\s+(?![\w.])")
+
+
+class UnsafeExpression(ValueError):
+    pass
+
+
+# Potência com limite no expoente e no tamanho do resultado inteiro; os compilados
+# chamam esta função no lugar de **.
+def _power(base: int | float, exponent: int | float) -> int | float:
+    if abs(exponent) > MAX_EXPONENT:
+        raise UnsafeExpression(f"exponent {exponent} is larger than {MAX_EXPONENT}")
+    if base < 0 and not float(exponent).is_integer():
+        # Em Python o resultado seria um número complexo.
+        raise UnsafeExpression(f"{base} ** {exponent} has no real result")
+    if type(base) is int and type(exponent) is int and exponent > 0:
+        # Entre floats o resultado tem tamanho fixo; entre inteiros ele cresce com base e expoente.
+        if abs(base).bit_length() * exponent > MAX_RESULT_BITS:
+            raise UnsafeExpression(f"result of ** would be larger than {MAX_RESULT_BITS} bits")
+    return operator.pow(base, exponent)
+
+
+_GLOBALS = {"__builtins__": {}, "_power": _power}
+
+
+# Verifica os nós permitidos e troca cada `a ** b` por `_power(a, b)`.
+class _Validator(ast.NodeTransformer):
+
+    def visit_Expression(self, node: ast.Expression) -> ast.Expression:
+        self.generic_visit(node)
+        return node
+
+    def visit_Constant(self, node: ast.Constant) -> ast.Constant:
+        if type(node.value) not in (int, float):
+            raise UnsafeExpression(f"only numbers are allowed, got {node.value!r}")
+        return node
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.UnaryOp:
+        if not isinstance(node.op, _UNARY_OPERATORS):
+            raise UnsafeExpression(f"operator {type(node.op).__name__} is not allowed")
+        self.generic_visit(node)
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.expr:
+        if not isinstance(node.op, _BINARY_OPERATORS):
+            raise UnsafeExpression(f"operator {type(node.op).__name__} is not allowed")
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            call = ast.Call(func=ast.Name(id="_power", ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+            return ast.copy_location(call, node)
+        return node
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if not isinstance(node, (ast.Expression, ast.Constant, ast.UnaryOp, ast.BinOp, ast.operator, ast.unaryop)):
+            raise UnsafeExpression(f"{type(node).__name__} is not allowed")
+        return super().generic_visit(node)
+
+
+def normalize(expression: str) -> str:
+    return _SPACE_RE.sub("", _SEPARATOR_RE.sub(" ", expression))
+
+
+# Analisa, valida e compila uma expressão já normalizada (com cache pelo texto).
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(expression: str) -> CodeType:
+    if not expression:
+        raise UnsafeExpression("empty expression")
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise UnsafeExpression(f"expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as exc:
+        raise UnsafeExpression(f"invalid expression: {exc.msg}") from None
+    tree = ast.fix_missing_locations(_Validator().visit(tree))
+    return compile(tree, "<calculate>", "eval")
+
+
+def evaluate(expression: str) -> int | float:
+    if len(expression) > MAX_EXPRESSION_LENGTH * 2:
+        # Recusa textos enormes antes de normalizar.
+        raise UnsafeExpression(f"expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+    return eval(compile_expression(normalize(expression)), _GLOBALS)
+
+
+if __name__ == "__main__":
+    assert evaluate("(12 + 3) * 1.10") == eval("(12 + 3) * 1.10") == 16.5
+    assert evaluate("15+3") == 18 and evaluate("-2 ** 2") == -4 and evaluate("7 % 4") == 3
+    assert evaluate("5.972e24 * 2") == 1.1944e25
+    assert evaluate("2 ** -1") == 0.5 and evaluate("10 ** 100") == 10**100
+    assert compile_expression.cache_info().currsize == 7
+    evaluate(" ( 12+3 )*1.10 ")
+    assert compile_expression.cache_info().hits == 1
+    assert normalize(" ( 12 +3 )\t* 1.10 ") == "(12+3)*1.10" and normalize("1  2") == "1 2"
+    assert evaluate("(-8) ** 2.0") == 64.0 and evaluate("(-2) ** -1") == -0.5
+
+    rejected = [
+        "__import__('os')",
+        "().__class__",
+        "9 ** 9 ** 9",
+        "2 ** 101",
+        "(-8) ** 0.5",
+        "(-8) ** (1 / 3)",
+        "(9 ** 99) ** 99",
+        "(((9**99)**99)**99)**99",
+        "x + 1",
+        "1 if 1 else 2",
+        "True + 1",
+        "'a' * 3",
+        "1 // 2",
+        "1 << 2",
+        "[1, 2]",
+        "",
+        "1 +",
+        "1 2",
+        "1" * (MAX_EXPRESSION_LENGTH + 1),
+    ]
+    for expression in rejected:
+        try:
+            evaluate(expression)
+        except UnsafeExpression:
+            continue
+        raise AssertionError(f"{expression!r} should be rejected")
+    try:
+        evaluate("1 / 0")
+    except ZeroDivisionError:
+        pass
+    else:
+        raise AssertionError("division by zero should raise")
+    print("calculator checks passed")
@@ -0,0 +1,203 @@
+"""
+Memória limitada das conversas do agente.
+
+No `Agent` do notebook, `self.messages` só cresce: cada pergunta, resposta e
+`Observation:` fica para sempre e é reenviada ao LLM a cada iteração, então o tamanho
+do prompt (custo e latência) aumenta a cada passo e agentes de vida longa vazam memória.
+
+`ConversationMemory` guarda as mensagens com um orçamento de tokens (`max_tokens`):
+
+- o system prompt e as `keep_recent` mensagens mais recentes são sempre mantidos;
+- quando o total passa do orçamento, as mensagens mais antigas saem da memória;
+- se houver um `summarizer`, as mensagens removidas são resumidas por ele e o resumo
+  entra logo depois do system prompt (substituindo o resumo anterior);
+- o resumo também conta no orçamento: se não couber no que sobra, perde as linhas mais
+  antigas (e, se preciso, o começo da linha restante) até caber.
+
+O `summarizer` recebe `(mensagens removidas, resumo anterior ou None)` e devolve o novo
+resumo; pode ser uma função comum ou `async` (ex.: outra chamada ao LLM).
+
+Os tokens são estimados por `estimate_tokens` (cerca de 4 caracteres por token), ou por
+outro `token_counter`, e contados uma vez por mensagem, então o total é mantido em O(1).
+"""
+
+import inspect
+from collections import deque
+from typing import Awaitable, Callable, Iterable
+
+Message = dict[str, str]
+Summarizer = Callable[[list[Message], str | None], str | Awaitable[str]]
+
+# Tokens extras por mensagem (papel e separadores), como nas APIs de chat.
+MESSAGE_OVERHEAD = 4
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class ConversationMemory:
+
+    def __init__(
+        self,
+        system: str | None = None,
+        max_tokens: int | None = None,
+        keep_recent: int = 6,
+        summarizer: Summarizer | None = None,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.summarizer = summarizer
+        self.token_counter = token_counter
+        self.system: Message | None = None if system is None else {"role": "system", "content": system}
+        self.summary: str | None = None
+        # (mensagem, tokens) em ordem; o total é atualizado a cada entrada e saída.
+        self._turns: deque[tuple[Message, int]] = deque()
+        self._fixed_tokens = 0 if self.system is None else self._count(self.system)
+        self._summary_tokens = 0
+        self._turn_tokens = 0
+        self.evicted = 0
+
+    def _count(self, message: Message) -> int:
+        return self.token_counter(message["content"]) + MESSAGE_OVERHEAD
+
+    def append(self, message: Message) -> None:
+        tokens = self._count(message)
+        self._turns.append((message, tokens))
+        self._turn_tokens += tokens
+
+    def extend(self, messages: Iterable[Message]) -> None:
+        for message in messages:
+            self.append(message)
+
+    # Tokens estimados do prompt atual (system + resumo + mensagens mantidas).
+    @property
+    def tokens(self) -> int:
+        return self._fixed_tokens + self._summary_tokens + self._turn_tokens
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    # Mensagens a enviar ao LLM, na ordem.
+    def messages(self) -> list[Message]:
+        messages = [] if self.system is None else [self.system]
+        if self.summary is not None:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + self.summary})
+        messages.extend(message for message, _ in self._turns)
+        return messages
+
+    # Remove (e resume, se houver summarizer) as mensagens antigas até caber no orçamento.
+    # Nunca remove o system prompt nem as keep_recent mensagens mais recentes; se o novo
+    # resumo ainda deixar o prompt acima do orçamento, remove mais mensagens e, sem mais
+    # mensagens para remover, corta o resumo.
+    async def fit(self) -> None:
+        if self.max_tokens is None:
+            return
+        while self.tokens > self.max_tokens and len(self._turns) > self.keep_recent:
+            evicted = []
+            while len(self._turns) > self.keep_recent and self.tokens > self.max_tokens:
+                message, tokens = self._turns.popleft()
+                self._turn_tokens -= tokens
+                evicted.append(message)
+            self.evicted += len(evicted)
+            if self.summarizer is not None:
+                summary = self.summarizer(evicted, self.summary)
+                if inspect.isawaitable(summary):
+                    summary = await summary
+                self.summary = summary
+                self._summary_tokens = self._count({"content": SUMMARY_PREFIX + summary})
+        if self.summary is not None and self.tokens > self.max_tokens:
+            self._trim_summary()
+
+    # Corta o resumo ao que sobra do orçamento, mantendo o final (o mais recente). O resumo
+    # cortado é o `previous` da próxima chamada, então ele não cresce sem limite.
+    def _trim_summary(self) -> None:
+        budget = self.max_tokens - self._fixed_tokens - self._turn_tokens
+        lines = self.summary.split("\n")
+        start = 0
+        text = self.summary
+        while start < len(lines) and self._count({"content": SUMMARY_PREFIX + text}) > budget:
+            start += 1
+            text = "\n".join(lines[start:])
+        if start == len(lines):
+            # Nem a última linha cabe inteira: fica o final dela, se sobrar espaço.
+            text = lines[-1]
+            while text and self._count({"content": SUMMARY_PREFIX + text}) > budget:
+                text = text[len(text) // 4 + 1:]
+        self.summary = text or None
+        self._summary_tokens = self._count({"content": SUMMARY_PREFIX + text}) if text else 0
+
+
+# Resumo simples sem LLM: mantém só as perguntas do usuário e as respostas finais.
+def keep_questions_and_answers(evicted: list[Message], previous: str | None) -> str:
+    lines = [] if previous is None else [previous]
+    for message in evicted:
+        content = message["content"]
+        if message["role"] == "user" and not content.startswith("Observation:"):
+            lines.append(f"Question: {content}")
+        elif message["role"] == "assistant" and "Answer:" in content:
+            lines.append(content[content.index("Answer:"):])
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    from agent import PIZZA_SCRIPT, AsyncAgent, FakeLLMClient
+
+    memory = ConversationMemory("system prompt", max_tokens=50, keep_recent=2, summarizer=keep_questions_and_answers)
+    memory.extend(
+        [
+            {"role": "user", "content": "I want a Cheese pizza"},
+            {"role": "assistant", "content": "Action: get_menu\nPAUSE"},
+            {"role": "user", "content": "Observation: " + "x" * 80},
+            {"role": "assistant", "content": "Answer: $12.00"},
+            {"role": "user", "content": "And a Coke?"},
+            {"role": "assistant", "content": "Action: get_menu\nPAUSE"},
+        ]
+    )
+    asyncio.run(memory.fit())
+    messages = memory.messages()
+    assert messages[0] == {"role": "system", "content": "system prompt"}
+    assert messages[1]["content"] == SUMMARY_PREFIX + "Question: I want a Cheese pizza\nAnswer: $12.00"
+    assert [m["content"] for m in messages[2:]] == ["And a Coke?", "Action: get_menu\nPAUSE"]
+    assert memory.tokens <= 50 and memory.evicted == 4
+    assert memory.tokens == sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+    # Responde pelo último passo (e não pelo número de respostas no prompt, que a memória limita).
+    def reply(messages: list[Message]) -> str:
+        last = messages[-1]["content"]
+        if not last.startswith("Observation:"):
+            return PIZZA_SCRIPT[0]
+        return PIZZA_SCRIPT[1] if last.startswith("Observation: {") else PIZZA_SCRIPT[2]
+
+    # Um cliente de vida longa: 20 pedidos na mesma conversa, com e sem orçamento.
+    async def long_conversation(
+        max_tokens: int | None, orders: int = 20, summarizer: Summarizer | None = None
+    ) -> list[int]:
+        agent = AsyncAgent(FakeLLMClient(reply), max_prompt_tokens=max_tokens, keep_recent=6, summarizer=summarizer)
+        conversation = agent.new_conversation()
+        for index in range(orders):
+            conversation.iterations = 0
+            await agent.run_loop(f"Order {index}: a Cheese pizza and a Sprite, eating here.", conversation=conversation)
+        return conversation.prompt_tokens
+
+    unbounded = asyncio.run(long_conversation(None))
+    bounded = asyncio.run(long_conversation(1200))
+    assert len(unbounded) == len(bounded) == 60
+    assert max(bounded) <= 1200 < max(unbounded)
+
+    # Com summarizer, o resumo também respeita o orçamento numa conversa longa.
+    summarized = asyncio.run(long_conversation(1200, orders=300, summarizer=keep_questions_and_answers))
+    assert len(summarized) == 900 and max(summarized) <= 1200
+
+    # Um resumo de uma linha só maior que o orçamento é cortado pelo começo.
+    memory = ConversationMemory("system prompt", max_tokens=40, keep_recent=1, summarizer=lambda evicted, previous: "y" * 500)
+    memory.extend([{"role": "user", "content": "first " * 40}, {"role": "user", "content": "second"}])
+    asyncio.run(memory.fit())
+    assert memory.tokens <= 40 and memory.summary and set(memory.summary) == {"y"}
+    print(f"prompt tokens per call: unbounded max {max(unbounded)} / mean {sum(unbounded) // 60}")
+    print(f"prompt tokens per call: bounded   max {max(bounded)} / mean {sum(bounded) // 60}")
+    print("memory checks passed")
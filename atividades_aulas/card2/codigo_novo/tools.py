@@ -0,0 +1,194 @@
+"""
+Registro de ferramentas do agente com cache de resultados.
+
+No `Agent.loop` dos notebooks cada Action chama a ferramenta de novo, mesmo quando o
+resultado não muda (`get_menu()` remonta e serializa o JSON do cardápio a cada turno).
+
+Aqui cada ferramenta é registrada num `ToolRegistry` dizendo:
+
+- `cacheable`: se o resultado pode ser reaproveitado;
+- `ttl`: por quantos segundos o resultado vale (None = até sair do cache);
+- `normalize`: como o argumento é normalizado antes de virar chave do cache (ex.: "12+3"
+  e " 12 + 3 " são a mesma conta; "Earth" e "earth" o mesmo planeta). A ferramenta
+  cacheable recebe o argumento normalizado, então argumentos com a mesma chave sempre
+  dão o mesmo resultado, com ou sem cache.
+
+Os resultados ficam num `ToolCache` LRU com contadores de acertos e falhas. O cache é
+do registro, não da conversa, então todas as conversas que usam o mesmo registro
+compartilham os resultados: uma ferramenta cara (ex.: cardápio vindo do banco) é
+chamada uma vez por TTL, e não uma vez por turno.
+
+Uso:
+
+    registry = ToolRegistry(maxsize=1024)
+    registry.register("get_menu", get_menu, cacheable=True, ttl=60)
+    registry.register("get_planet_mass", get_planet_mass, cacheable=True, normalize=lower)
+    registry.run("get_planet_mass", "Earth")
+    registry.cache.hits, registry.cache.misses
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+Normalizer = Callable[[str | None], str | None]
+
+_MISSING = object()
+
+
+def strip(arg: str | None) -> str | None:
+    return None if arg is None else arg.strip()
+
+
+def lower(arg: str | None) -> str | None:
+    return None if arg is None else arg.strip().lower()
+
+
+@dataclass(frozen=True)
+class Tool:
+    name: str
+    func: Callable[..., Any]
+    cacheable: bool = False
+    ttl: float | None = None
+    normalize: Normalizer = strip
+
+    def __call__(self, arg: str | None) -> Any:
+        return self.func() if arg is None else self.func(arg)
+
+
+# Cache LRU com validade por entrada. O lock permite usar o mesmo cache a partir de threads.
+class ToolCache:
+
+    def __init__(self, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Devolve o valor guardado ou _MISSING (se não existe ou venceu).
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+            return _MISSING
+
+    def put(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        expires_at = None if ttl is None else self.clock() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class ToolRegistry:
+
+    def __init__(self, maxsize: int = 1024, cache: ToolCache | None = None) -> None:
+        self.cache = ToolCache(maxsize) if cache is None else cache
+        self._tools: dict[str, Tool] = {}
+
+    def register(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        cacheable: bool = False,
+        ttl: float | None = None,
+        normalize: Normalizer = strip,
+    ) -> Tool:
+        tool = Tool(name, func, cacheable, ttl, normalize)
+        self._tools[name] = tool
+        return tool
+
+    def get(self, name: str) -> Tool | None:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __iter__(self):
+        return iter(self._tools)
+
+    # Executa a ferramenta, usando o cache quando ela é cacheable. Levanta KeyError se não existe.
+    # Exceções da ferramenta não são guardadas no cache.
+    def run(self, name: str, arg: str | None = None) -> Any:
+        tool = self._tools[name]
+        if not tool.cacheable:
+            return tool(arg)
+        arg = tool.normalize(arg)
+        key = (name, arg)
+        value = self.cache.get(key)
+        if value is _MISSING:
+            value = tool(arg)
+            self.cache.put(key, value, tool.ttl)
+        return value
+
+
+# Registro sem cache a partir de um dict nome -> função (o formato de TOOLS nos notebooks).
+def registry_from_dict(tools: dict[str, Callable[..., Any]]) -> ToolRegistry:
+    registry = ToolRegistry(maxsize=0)
+    for name, func in tools.items():
+        registry.register(name, func)
+    return registry
+
+
+if __name__ == "__main__":
+    now = [0.0]
+    calls = []
+
+    def menu() -> str:
+        calls.append("menu")
+        return '{"Cheese": 12.0}'
+
+    registry = ToolRegistry(cache=ToolCache(maxsize=2, clock=lambda: now[0]))
+    registry.register("get_menu", menu, cacheable=True, ttl=60)
+    registry.register("echo", lambda arg: calls.append(arg) or arg, cacheable=True, normalize=lower)
+    registry.register("now", lambda: calls.append("now") or now[0])
+
+    assert registry.run("get_menu") == registry.run("get_menu") == '{"Cheese": 12.0}'
+    assert calls == ["menu"] and registry.cache.hits == 1 and registry.cache.misses == 1
+    now[0] = 61.0
+    registry.run("get_menu")
+    assert calls == ["menu", "menu"] and registry.cache.expired == 1
+
+    assert registry.run("echo", "Earth") == "earth"
+    assert registry.run("echo", " EARTH ") == "earth" and calls.count("earth") == 1
+    registry.run("now")
+    registry.run("now")
+    assert calls.count("now") == 2, "tools that are not cacheable always run"
+
+    registry.run("echo", "1")
+    assert len(registry.cache) == 2 and registry.cache.evicted == 1
+    assert registry.cache.stats() == {"size": 2, "hits": 2, "misses": 4, "expired": 1, "evicted": 1}
+    assert "get_menu" in registry and "get_weather" not in registry
+    print("tools checks passed")
@@ -0,0 +1,64 @@
+"""
+Benchmark das buscas do CarWashSystem.
+
+Popula o sistema com 1k a 100k carros (uma ordem por carro, um proprietário para
+cada 2 carros) e mede a latência de `get_car(placa)`, `get_service(nome)` e
+`orders_for_owner(cpf)`, comparando a busca por placa com a varredura linear antiga
+sobre `get_cars()` (medida só até `--scan-limit` carros).
+
+`orders_using_service` não é medido: ele devolve uma fração fixa das ordens, então
+o custo cresce com o tamanho do resultado, não com o da busca.
+
+Uso:
+    python bench_car_wash.py
+    python bench_car_wash.py --sizes 1000 50000 --lookups 5000
+"""
+
+import argparse
+import random
+
+from bench_models import make_car, make_service
+from bench_users import measure, report
+from car_wash import Car, CarWashService, CarWashSystem, WashOrder
+
+
+def build_system(size: int) -> CarWashSystem:
+    system = CarWashSystem()
+    services = [CarWashService.model_validate(make_service(index)) for index in range(10)]
+    for service in services:
+        system.add_service(service)
+    for index in range(size):
+        raw = make_car(index)
+        raw["owner"] = {**raw["owner"], "cpf": f"{index // 2:011d}"}
+        car = Car.model_validate(raw)
+        system.add_car(car)
+        system.add_order(WashOrder(car=car, services=[services[index % 10], services[(index + 3) % 10]]))
+    return system
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--scan-limit", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'lookup':<14} {'cars':>9} {'mean (us)':>10} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for size in args.sizes:
+        system = build_system(size)
+        sample = random.choices(system.get_cars(), k=args.lookups)
+        plates = [car.plate for car in sample]
+        cpfs = [car.owner.cpf for car in sample]
+
+        report("get_car", size, measure(system.get_car, plates))
+        report("for_owner", size, measure(system.orders_for_owner, cpfs))
+        report("get_service", size, measure(system.get_service, [f"Service {index % 10}" for index in range(args.lookups)]))
+
+        if size <= args.scan_limit:
+            cars = system.get_cars()
+            scan_plates = plates[: max(1, args.lookups // 10)]
+            report("linear scan", size, measure(lambda plate: next(c for c in cars if c.plate == plate), scan_plates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark da latência do event loop durante logins concorrentes.
+
+Enquanto `--logins` verificações de senha rodam ao mesmo tempo, uma tarefa mede o
+atraso do event loop (quanto um `asyncio.sleep(0.001)` demora além do previsto).
+Modos comparados:
+
+- inline: KDF chamada direto no handler async (bloqueia o loop, comportamento antigo).
+- executor: KDF no pool de threads do `PasswordHasher`, sem cache.
+- executor+cache: igual ao anterior, com o cache de logins aquecido.
+
+Uso:
+    python bench_login.py
+    python bench_login.py --algorithm scrypt --logins 50 --workers 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from new import User
+from passwords import ALGORITHMS, LoginCache, PasswordHasher
+from user_repository import InMemoryUserRepository
+
+
+# Mede o atraso do event loop até `stop` ser sinalizado. Retorna os atrasos em ms.
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.001) -> list[float]:
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+    return lags
+
+
+async def run(mode: str, hasher: PasswordHasher, users: list[User], password: str) -> tuple[float, list[float]]:
+    async def login(user: User) -> bool:
+        if mode == "inline":
+            return hasher.verify(password, user)
+        return await hasher.verify_async(password, user)
+
+    if mode == "executor+cache":
+        await asyncio.gather(*(login(user) for user in users))
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login(user) for user in users))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lags = await lag_task
+    assert all(results), "every login should succeed"
+    return elapsed, lags
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="pbkdf2_sha256")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    password = "correct horse battery staple"
+    hasher = PasswordHasher(args.algorithm, max_workers=args.workers, cache=LoginCache(max_size=args.logins))
+    repository = InMemoryUserRepository()
+    for i in range(args.logins):
+        hashed = hasher.hash(password)
+        repository.add(
+            User(
+                name=f"User {i}",
+                email=f"user{i}@example.com",
+                password_hash=hashed.hash,
+                password_salt=hashed.salt,
+                password_algorithm=hashed.algorithm,
+            )
+        )
+    users = repository.list_all()
+
+    print(f"algorithm={args.algorithm} logins={args.logins} workers={hasher.max_workers}")
+    print(f"{'mode':<16} {'total (s)':>10} {'lag p50 (ms)':>13} {'lag max (ms)':>13}")
+    for mode in ("inline", "executor", "executor+cache"):
+        hasher.cache.clear()
+        elapsed, lags = asyncio.run(run(mode, hasher, users, password))
+        lags = lags or [0.0]
+        print(f"{mode:<16} {elapsed:>10.3f} {statistics.median(lags):>13.2f} {max(lags):>13.2f}")
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Benchmark de validação e serialização de todos os modelos do card3.
+
+Para cada modelo, gera `--count` entradas sintéticas válidas e mede:
+
+- `model_validate` (dict) e `model_validate_json` (bytes), em objetos/s;
+- `model_dump` e `model_dump_json`, em objetos/s;
+- memória por objeto validado (tracemalloc), em bytes.
+
+Cada medida é a melhor de `--repeat` rodadas. O resultado pode ser gravado em JSON
+(`--output`) e comparado com um baseline salvo antes (`--baseline`): o script sai com
+código 1 se alguma vazão cair, ou a memória subir, mais que `--threshold` (fração).
+
+Uso:
+    python bench_models.py --output baseline.json
+    python bench_models.py --baseline baseline.json --threshold 0.15
+    python bench_models.py --models Order Car --count 5000
+"""
+
+import argparse
+import importlib.util
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
+from uuid import uuid4
+
+import pydantic
+from pydantic import BaseModel
+
+import car_wash
+import new
+import order_import
+from bench_orders import make_raw_orders
+
+ORIGINAL_DIR = Path(__file__).resolve().parent.parent / "original"
+
+# Medidas de vazão (maior é melhor) e de memória (menor é melhor).
+THROUGHPUT_METRICS = ("validate_per_s", "validate_json_per_s", "dump_per_s", "dump_json_per_s")
+MEMORY_METRICS = ("bytes_per_object",)
+
+
+# Carrega original/example_N.py como módulo (a pasta não é um pacote).
+def load_example(name: str) -> Any:
+    spec = importlib.util.spec_from_file_location(name, ORIGINAL_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Um modelo a medir e o gerador de entradas válidas (dict novo a cada chamada,
+# pois alguns validadores `mode="before"` alteram o dict recebido).
+class Case(NamedTuple):
+    name: str
+    model: type[BaseModel]
+    make: Callable[[int], dict[str, Any]]
+
+
+def make_owner(index: int) -> dict[str, Any]:
+    return {
+        "name": f"Owner {index}",
+        "email": f"owner{index}@example.com",
+        "phone": f"55119{index:08d}",
+        "cpf": f"{index:011d}",
+    }
+
+
+def make_car(index: int) -> dict[str, Any]:
+    return {
+        "brand": ("toyota", "honda", "ford", "bmw", "audi")[index % 5],
+        "model": f"Model {index % 50}",
+        "color": ("white", "black", "silver", "blue", "red")[index % 5],
+        "plate": f"{chr(65 + index % 26)}{chr(65 + index // 26 % 26)}{chr(65 + index // 676 % 26)}{index % 10000:04d}",
+        "owner": make_owner(index),
+    }
+
+
+def make_service(index: int) -> dict[str, Any]:
+    return {"name": f"Service {index % 10}", "price": 10.0 + index % 10 * 2.5}
+
+
+def make_example_user(index: int) -> dict[str, Any]:
+    # Nome só com letras e senha com maiúscula, minúscula e número (regras de example_2/3).
+    letters = "".join(chr(97 + int(digit)) for digit in str(index))
+    return {
+        "name": f"User{letters}",
+        "email": f"user{index}@example.com",
+        "password": f"Secret{index}Pass",
+        "role": 1,
+    }
+
+
+def build_cases() -> list[Case]:
+    examples = {name: load_example(name) for name in ("example_1", "example_2", "example_3", "example_4")}
+    raw_orders = make_raw_orders(1000)
+    password_hash = "0" * 64
+
+    def new_user(index: int) -> dict[str, Any]:
+        return {
+            "name": f"User {index}",
+            "email": f"user{index}@example.com",
+            "password_hash": password_hash,
+            "signup_ts": "2026-01-01T00:00:00",
+        }
+
+    def example_4_user(index: int) -> dict[str, Any]:
+        return {"name": f"User {index}", "email": f"user{index}@example.com", "signup_ts": "2026-01-01T00:00:00"}
+
+    return [
+        Case("Order", order_import.Order, lambda index: dict(raw_orders[index % len(raw_orders)])),
+        Case("Customer", order_import.Customer, lambda index: dict(raw_orders[index % len(raw_orders)]["customer"])),
+        Case("Item", order_import.Item, lambda index: dict(raw_orders[index % len(raw_orders)]["items"][0])),
+        Case(
+            "ShippingLabel",
+            order_import.ShippingLabel,
+            lambda index: {"orderId": f"O{index}", "createdAt": "2026-01-01T00:00:00", "email": f"c{index}@example.com"},
+        ),
+        Case("CarOwner", car_wash.CarOwner, make_owner),
+        Case("Car", car_wash.Car, make_car),
+        Case("CarWashService", car_wash.CarWashService, make_service),
+        Case(
+            "WashOrder",
+            car_wash.WashOrder,
+            lambda index: {"car": make_car(index), "services": [make_service(index), make_service(index + 1)]},
+        ),
+        Case(
+            "CarWashRequest",
+            car_wash.CarWashRequest,
+            lambda index: {"cars": [make_car(index)], "services": [make_service(index)]},
+        ),
+        Case("example_1.User", examples["example_1"].User, make_example_user),
+        Case("example_2.User", examples["example_2"].User, make_example_user),
+        Case("example_3.User", examples["example_3"].User, make_example_user),
+        Case("example_4.User", examples["example_4"].User, example_4_user),
+        Case("new.User", new.User, new_user),
+        Case("new.UserResponse", new.UserResponse, lambda index: {**example_4_user(index), "id": str(uuid4())}),
+        Case(
+            "new.CreateUserRequest",
+            new.CreateUserRequest,
+            lambda index: {"name": f"User {index}", "email": f"user{index}@example.com", "password": "secret"},
+        ),
+        Case("new.LoginRequest", new.LoginRequest, lambda index: {"email": f"user{index}@example.com", "password": "secret"}),
+        Case(
+            "new.UpdatePasswordRequest",
+            new.UpdatePasswordRequest,
+            lambda index: {"current_password": "secret", "new_password": f"secret{index}"},
+        ),
+    ]
+
+
+# Melhor vazão (objetos/s) de `run` sobre entradas novas a cada rodada.
+def best_rate(run: Callable[[list[Any]], Any], make_inputs: Callable[[], list[Any]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        inputs = make_inputs()
+        start = time.perf_counter()
+        run(inputs)
+        best = min(best, time.perf_counter() - start)
+    return len(inputs) / best
+
+
+def bytes_per_object(case: Case, count: int) -> float:
+    inputs = [case.make(index) for index in range(count)]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [case.model.model_validate(raw) for raw in inputs]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(objects) == count
+    return (after - before) / count
+
+
+def measure(case: Case, count: int, repeat: int) -> dict[str, float]:
+    model = case.model
+
+    def dicts() -> list[dict[str, Any]]:
+        return [case.make(index) for index in range(count)]
+
+    payloads = [json.dumps(case.make(index)).encode() for index in range(count)]
+    objects = [model.model_validate(case.make(index)) for index in range(count)]
+    return {
+        "validate_per_s": best_rate(lambda inputs: [model.model_validate(raw) for raw in inputs], dicts, repeat),
+        "validate_json_per_s": best_rate(
+            lambda inputs: [model.model_validate_json(raw) for raw in inputs], lambda: payloads, repeat
+        ),
+        "dump_per_s": best_rate(lambda inputs: [obj.model_dump() for obj in inputs], lambda: objects, repeat),
+        "dump_json_per_s": best_rate(lambda inputs: [obj.model_dump_json() for obj in inputs], lambda: objects, repeat),
+        "bytes_per_object": bytes_per_object(case, count),
+    }
+
+
+# Compara com o baseline e retorna as regressões acima do limite, uma por linha.
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], threshold: float) -> list[str]:
+    regressions = []
+    for name, metrics in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in THROUGHPUT_METRICS:
+            if metric in previous and metrics[metric] < previous[metric] * (1 - threshold):
+                change = metrics[metric] / previous[metric] - 1
+                regressions.append(f"{name}.{metric}: {previous[metric]:,.0f} -> {metrics[metric]:,.0f} ({change:+.1%})")
+        for metric in MEMORY_METRICS:
+            if metric in previous and metrics[metric] > previous[metric] * (1 + threshold):
+                change = metrics[metric] / previous[metric] - 1
+                regressions.append(f"{name}.{metric}: {previous[metric]:,.0f} -> {metrics[metric]:,.0f} ({change:+.1%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--models", nargs="+", help="only these models (names as printed)")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="compare with a JSON file written by --output")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    cases = build_cases()
+    if args.models:
+        unknown = set(args.models) - {case.name for case in cases}
+        if unknown:
+            parser.error(f"unknown models: {', '.join(sorted(unknown))}")
+        cases = [case for case in cases if case.name in args.models]
+
+    print(f"count={args.count} repeat={args.repeat}")
+    print(
+        f"{'model':<26} {'validate/s':>11} {'json in/s':>11} {'dump/s':>11} {'json out/s':>11} {'bytes/obj':>10}"
+    )
+    results = {}
+    for case in cases:
+        metrics = results[case.name] = measure(case, args.count, args.repeat)
+        print(
+            f"{case.name:<26} {metrics['validate_per_s']:>11,.0f} {metrics['validate_json_per_s']:>11,.0f} "
+            f"{metrics['dump_per_s']:>11,.0f} {metrics['dump_json_per_s']:>11,.0f} {metrics['bytes_per_object']:>10,.0f}"
+        )
+
+    if args.output:
+        document = {
+            "meta": {
+                "python": platform.python_version(),
+                "pydantic": pydantic.VERSION,
+                "platform": platform.platform(),
+                "count": args.count,
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        args.output.write_text(json.dumps(document, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nregressions above {args.threshold:.0%} against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nno regressions above {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
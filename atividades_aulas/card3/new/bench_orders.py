@@ -0,0 +1,78 @@
+"""
+Benchmark da validação de pedidos em paralelo.
+
+Gera pedidos sintéticos e compara `parse_orders` (um núcleo) com
+`parse_orders_parallel` usando de 1 até `--max-workers` processos.
+
+Uso:
+    python bench_orders.py
+    python bench_orders.py --count 100000 --chunk-size 2000 --max-workers 8
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from order_import import parse_orders, parse_orders_parallel
+
+START = datetime(2026, 1, 1)
+
+
+# Pedido sintético válido, determinístico para o mesmo `index` e `rng`.
+def make_raw_order(index: int, rng: random.Random) -> dict[str, Any]:
+    items = [
+        {
+            "sku": f"SKU-{rng.randrange(1000)}",
+            "quantity": rng.randint(1, 5),
+            "unit_price": f"{rng.randint(100, 9999) / 100:.2f}",
+        }
+        for _ in range(rng.randint(1, 5))
+    ]
+    return {
+        "id": f"O{index}",
+        "created_at": (START + timedelta(seconds=index)).isoformat(),
+        "customer": {"name": f"  Customer {index % 5000}  ", "email": f"CUSTOMER{index % 5000}@EXAMPLE.COM"},
+        "items": items,
+        "coupon": None,
+    }
+
+
+def make_raw_orders(count: int, seed: int = 42) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [make_raw_order(index, rng) for index in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    raw_orders = make_raw_orders(args.count)
+    print(f"orders={args.count} chunk_size={args.chunk_size} cpus={os.cpu_count()}")
+    print(f"{'mode':<14} {'seconds':>9} {'orders/s':>12} {'speedup':>8}")
+
+    start = time.perf_counter()
+    baseline = parse_orders(raw_orders)
+    serial = time.perf_counter() - start
+    print(f"{'serial':<14} {serial:>9.2f} {args.count / serial:>12,.0f} {1.0:>8.2f}")
+
+    counts = {args.max_workers}
+    workers = 1
+    while workers < args.max_workers:
+        counts.add(workers)
+        workers *= 2
+    for workers in sorted(counts):
+        start = time.perf_counter()
+        orders = parse_orders_parallel(raw_orders, chunk_size=args.chunk_size, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        assert [order.id for order in orders] == [order.id for order in baseline], "order must be preserved"
+        print(f"{f'{workers} workers':<14} {elapsed:>9.2f} {args.count / elapsed:>12,.0f} {serial / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
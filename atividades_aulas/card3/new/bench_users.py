@@ -0,0 +1,96 @@
+"""
+Benchmark do repositório de usuários.
+
+Mede a latência de busca por id e por email no `InMemoryUserRepository` para
+tamanhos de 1k a 1M usuários e compara com a varredura linear antiga
+(`next(...)` sobre uma lista), que só é medida até `--scan-limit` usuários.
+
+Uso:
+    python bench_users.py
+    python bench_users.py --sizes 1000 10000 --lookups 5000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from uuid import uuid4
+
+from new import User
+from user_repository import InMemoryUserRepository
+
+PASSWORD_HASH = "0" * 64
+
+
+# Cria usuários sem validação (dados confiáveis), para popular rapidamente.
+def make_users(count: int) -> list[User]:
+    return [
+        User.model_construct(
+            name=f"User {i}",
+            email=f"user{i}@example.com",
+            password_hash=PASSWORD_HASH,
+            password_salt="",
+            password_algorithm="sha256",
+            friends=[],
+            blocked=[],
+            signup_ts=None,
+            id=uuid4(),
+        )
+        for i in range(count)
+    ]
+
+
+# Executa `lookup` para cada chave e retorna as latências em microssegundos.
+def measure(lookup, keys) -> list[float]:
+    timings = []
+    for key in keys:
+        start = time.perf_counter_ns()
+        lookup(key)
+        timings.append((time.perf_counter_ns() - start) / 1000)
+    return timings
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def report(label: str, size: int, timings: list[float]) -> None:
+    print(
+        f"{label:<14} {size:>9} "
+        f"{statistics.mean(timings):>10.2f} {percentile(timings, 0.50):>10.2f} {percentile(timings, 0.99):>10.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--scan-limit", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'lookup':<14} {'users':>9} {'mean (us)':>10} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for size in args.sizes:
+        population = make_users(size)
+        repository = InMemoryUserRepository()
+        for user in population:
+            repository.add(user)
+
+        sample = random.choices(population, k=args.lookups)
+        ids = [user.id for user in sample]
+        emails = [user.email.upper() for user in sample]
+
+        report("repo.get", size, measure(repository.get, ids))
+        report("repo.by_email", size, measure(repository.get_by_email, emails))
+
+        if size <= args.scan_limit:
+            scan_ids = ids[: max(1, args.lookups // 10)]
+            report(
+                "linear scan",
+                size,
+                measure(lambda user_id: next(u for u in population if u.id == user_id), scan_ids),
+            )
+
+
+if __name__ == "__main__":
+    main()
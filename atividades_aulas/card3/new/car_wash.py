@@ -12,11 +12,21 @@ Depois de as informações é possível operar sobre o sistema de lavagem.
 - Obter serviços
 - Obter ordens de lavagem
 - Obter total de preço
+- Cancelar ordens de lavagem
+- Totais de receita (geral, por serviço e por dia) e ordens por marca, mantidos a cada ordem
+- Ordens que referenciam serviços pela chave (nome), resolvidas no catálogo do sistema
+- Proprietários e carros ligados pelo CPF (owner_cpf), sem referência circular
+- Buscar carro por placa e ordens por proprietário (CPF) ou por serviço, em O(1) via índices
 """
 
-from pydantic import BaseModel, Field, PositiveFloat, ValidationError, field_validator, model_validator, field_serializer, computed_field
+from pydantic import BaseModel, Field, PositiveFloat, PrivateAttr, SerializationInfo, SerializerFunctionWrapHandler, TypeAdapter, ValidationError, ValidationInfo, field_validator, model_validator, field_serializer, computed_field
+from typing_extensions import TypedDict
+import json
 import re
+from bisect import bisect_left
+from datetime import date, datetime
 from enum import Enum
+from typing import Any
 
 # Marcas de carros
 class CarBrand(str, Enum):
@@ -40,7 +50,23 @@ class Car(BaseModel):
     model: str = Field(..., description="The model of the car")
     color: CarColor = Field(..., description="The color of the car")
     plate: str = Field(..., description="The plate of the car")
-    owner: "CarOwner" = Field(default_factory=lambda: CarOwner())
+    # O proprietário é referenciado pelo CPF. O objeto (campo owner) é opcional e não é serializado:
+    # vem na entrada ou é preenchido pelo CarWashSystem com o proprietário cadastrado.
+    owner_cpf: str = Field(..., description="The CPF of the car owner")
+    owner: "CarOwner | None" = Field(default=None, exclude=True, description="The owner, resolved by CPF")
+
+    # Aceitar também só o proprietário inteiro, como antes: owner_cpf é preenchido a partir dele.
+    @model_validator(mode="before")
+    @classmethod
+    def fill_owner_cpf(cls, data: Any) -> Any:
+        if isinstance(data, dict) and data.get("owner") is not None:
+            owner = data["owner"]
+            cpf = owner.cpf if isinstance(owner, CarOwner) else owner.get("cpf") if isinstance(owner, dict) else None
+            if "owner_cpf" not in data:
+                data = {**data, "owner_cpf": cpf}
+            elif cpf != data["owner_cpf"]:
+                raise ValueError("owner.cpf must match owner_cpf")
+        return data
 
     # Validar placa do carro, deve ser uma string que contenha 3 letras maiúsculas e 4 números. Exemplo: AAA1234
     @field_validator("plate")
@@ -76,21 +102,16 @@ class Car(BaseModel):
             raise ValueError("brand is required if model is not blank")
         return self
 
-    # Serializar o carro para uma string, omitindo o proprietário
-    # Aqui utilizamos o field_serializer para serializar o carro para uma string, omitindo o proprietário.
-    # when_used: json indica que a serialização será feita para o formato JSON.
-    @field_serializer("owner", when_used="json")
-    def serialize_owner(self, v: "CarOwner") -> str:
-        return v.model_dump_json(exclude={"cars"})
-
 
 # Informações do proprietário do carro
 class CarOwner(BaseModel):
     name: str = Field(..., description="The name of the car owner")
     email: str = Field(..., description="The email of the car owner")
     phone: str = Field(..., description="The phone number of the car owner")
-    cars: list[Car] = Field(default_factory=list, description="The cars of the car owner")
     cpf: str = Field(description="The CPF of the car owner")
+    # Os carros do proprietário não ficam aqui: são buscados no sistema, com
+    # CarWashSystem.cars_for_owner(cpf). Assim o proprietário não aponta de volta para os
+    # carros nem para o sistema, e validar, copiar ou serializar um proprietário não percorre o grafo.
 
 
 # Serviços de lavagem e preços
@@ -109,6 +130,37 @@ class CarWashRequest(BaseModel):
 class WashOrder(BaseModel):
     car: Car = Field(..., description="The car to be washed")
     services: list[CarWashService] = Field(default_factory=list, description="The services to be used")
+    created_at: datetime = Field(default_factory=datetime.now, description="When the order was placed")
+
+    # Serviços podem vir pela chave (o nome) em vez do objeto inteiro, quando a validação recebe um catálogo
+    # no contexto: WashOrder.model_validate_json(data, context={"catalog": {nome: serviço}}).
+    # A chave é trocada pela instância do catálogo, então todas as ordens compartilham os mesmos objetos.
+    @field_validator("services", mode="before")
+    @classmethod
+    def resolve_service_keys(cls, v: Any, info: ValidationInfo) -> Any:
+        if not isinstance(v, list) or not any(isinstance(item, str) for item in v):
+            return v
+        catalog = (info.context or {}).get("catalog")
+        if catalog is None:
+            raise ValueError("service keys require a service catalog")
+        resolved = []
+        for item in v:
+            if isinstance(item, str):
+                service = catalog.get(item)
+                if service is None:
+                    raise ValueError(f"unknown service: {item}")
+                item = service
+            resolved.append(item)
+        return resolved
+
+    # Com context={"service_keys": True} na serialização, os serviços saem só como chaves (nomes).
+    @field_serializer("services", mode="wrap")
+    def serialize_services(
+        self, v: list[CarWashService], handler: SerializerFunctionWrapHandler, info: SerializationInfo
+    ) -> Any:
+        if info.context and info.context.get("service_keys"):
+            return [service.name for service in v]
+        return handler(v)
 
     # Validar regra de negócio: ao menos um serviço é obrigatório.
     # Aqui utilizamos o model_validator para validar a regra de negócio, pois depende de mais de um campo.
@@ -118,12 +170,15 @@ class WashOrder(BaseModel):
             raise ValueError("at least one service is required")
         return self
 
-    # Serializar a ordem de lavagem para uma string, omitindo o carro
-    # Aqui utilizamos o field_serializer para serializar a ordem de lavagem para uma string, omitindo o carro.
-    # when_used: json indica que a serialização será feita para o formato JSON.
-    @field_serializer("car", when_used="json")
-    def serialize_car(self, v: Car) -> str:
-        return v.model_dump_json(exclude={"owner"})
+    # Linha "plana" da ordem: o carro e o proprietário só como referências (placa e CPF).
+    def to_flat_row(self) -> "FlatWashOrder":
+        return {
+            "plate": self.car.plate,
+            "owner_cpf": self.car.owner_cpf,
+            "services": [service.name for service in self.services],
+            "total_price": self.total_price,
+            "created_at": self.created_at,
+        }
 
     # Calcular o total da ordem de lavagem
     # Aqui utilizamos o computed_field para calcular o total da ordem de lavagem.
@@ -134,25 +189,236 @@ class WashOrder(BaseModel):
         return sum(service.price for service in self.services)
 
 
+# Ordem serializada no modo plano (feeds de alto volume): referências em vez de objetos aninhados.
+class FlatWashOrder(TypedDict):
+    plate: str
+    owner_cpf: str
+    services: list[str]
+    total_price: float
+    created_at: datetime
+
+
+ORDERS_ADAPTER = TypeAdapter(list[WashOrder])
+FLAT_ORDERS_ADAPTER = TypeAdapter(list[FlatWashOrder])
+
+
+# Erro levantado ao adicionar um carro com uma placa já cadastrada.
+class DuplicatePlateError(ValueError):
+    pass
+
+
 # Sistema de lavagem de carros
 class CarWashSystem(BaseModel):
 
     # Campos do sistema de lavagem de carros
+    owners: list[CarOwner] = Field(default_factory=list, description="The owners of the cars")
     cars: list[Car] = Field(default_factory=list, description="The cars to be washed")
     services: list[CarWashService] = Field(default_factory=list, description="The services to be used")
     orders: list[WashOrder] = Field(default_factory=list, description="The orders to be processed")
 
-    # Adicionar um carro ao sistema
+    # Índices mantidos pelos métodos add_*: CPF -> proprietário, placa -> carro, CPF -> carros,
+    # CPF do proprietário -> ordens e nome do serviço -> ordens. As listas acima devem ser
+    # alteradas só por esses métodos.
+    _owners_by_cpf: dict[str, CarOwner] = PrivateAttr(default_factory=dict)
+    _cars_by_plate: dict[str, Car] = PrivateAttr(default_factory=dict)
+    _cars_by_owner: dict[str, list[Car]] = PrivateAttr(default_factory=dict)
+    _services_by_name: dict[str, CarWashService] = PrivateAttr(default_factory=dict)
+    _orders_by_owner: dict[str, list[WashOrder]] = PrivateAttr(default_factory=dict)
+    _orders_by_service: dict[str, list[WashOrder]] = PrivateAttr(default_factory=dict)
+    # Número de sequência de cada ordem (id do objeto -> número crescente na adição). As listas
+    # de ordens ficam em ordem de adição, então a posição de uma ordem em qualquer uma delas é
+    # encontrada por busca binária pelo número, sem percorrer a lista.
+    _order_seq: dict[int, int] = PrivateAttr(default_factory=dict)
+    _next_seq: int = PrivateAttr(default=0)
+
+    # Totais mantidos por add_order e desfeitos por remove_order, para leitura em O(1)
+    # (sem somar as ordens a cada chamada). Uma ordem não deve ser alterada depois de adicionada.
+    _revenue: float = PrivateAttr(default=0.0)
+    _revenue_by_service: dict[str, float] = PrivateAttr(default_factory=dict)
+    _revenue_by_day: dict[date, float] = PrivateAttr(default_factory=dict)
+    _orders_by_day: dict[date, int] = PrivateAttr(default_factory=dict)
+    _orders_by_brand: dict[CarBrand, int] = PrivateAttr(default_factory=dict)
+
+    # Diário opcional (ex.: CarWashStore, em car_wash_store.py) avisado de cada alteração,
+    # depois de ela ser aplicada: owner_added, car_added, service_added,
+    # order_added e order_removed.
+    _journal: Any = PrivateAttr(default=None)
+
+    # Monta os índices a partir das listas recebidas (ex.: model_validate_json do sistema inteiro).
+    # Placa repetida vira erro de validação.
+    @model_validator(mode="after")
+    def build_indexes(self):
+        for owner in self.owners:
+            self._index_owner(owner)
+        for car in self.cars:
+            self._index_car(car)
+        for service in self.services:
+            self._services_by_name[service.name] = service
+        for order in self.orders:
+            self._index_order(order)
+        return self
+
+    def _index_owner(self, owner: CarOwner) -> None:
+        if owner.cpf in self._owners_by_cpf:
+            raise ValueError(f"owner with CPF {owner.cpf} already exists")
+        self._owners_by_cpf[owner.cpf] = owner
+        for car in self._cars_by_owner.get(owner.cpf, ()):
+            car.owner = owner
+
+    def _index_car(self, car: Car) -> None:
+        if car.plate in self._cars_by_plate:
+            raise DuplicatePlateError(f"car with plate {car.plate} already exists")
+        self._cars_by_plate[car.plate] = car
+        self._cars_by_owner.setdefault(car.owner_cpf, []).append(car)
+        # O carro passa a apontar para o proprietário cadastrado (uma instância por CPF).
+        registered = self._owners_by_cpf.get(car.owner_cpf)
+        if registered is not None:
+            car.owner = registered
+
+    def _index_order(self, order: WashOrder) -> None:
+        if id(order) in self._order_seq:
+            raise ValueError("order was already added to this system")
+        self._order_seq[id(order)] = self._next_seq
+        self._next_seq += 1
+        self._orders_by_owner.setdefault(order.car.owner_cpf, []).append(order)
+        if order.car.owner is None:
+            order.car.owner = self._owners_by_cpf.get(order.car.owner_cpf)
+        # Um serviço repetido na mesma ordem indexa a ordem uma vez só.
+        for name in dict.fromkeys(service.name for service in order.services):
+            self._orders_by_service.setdefault(name, []).append(order)
+
+        day = order.created_at.date()
+        total = order.total_price
+        self._revenue += total
+        self._revenue_by_day[day] = self._revenue_by_day.get(day, 0.0) + total
+        self._orders_by_day[day] = self._orders_by_day.get(day, 0) + 1
+        self._orders_by_brand[order.car.brand] = self._orders_by_brand.get(order.car.brand, 0) + 1
+        for service in order.services:
+            self._revenue_by_service[service.name] = self._revenue_by_service.get(service.name, 0.0) + service.price
+
+    # Posição da ordem numa lista de ordens em ordem de adição, ou None se não estiver nela.
+    def _order_position(self, orders: list[WashOrder], order: WashOrder) -> int | None:
+        seqs = self._order_seq
+        seq = seqs.get(id(order))
+        if seq is None:
+            return None
+        position = bisect_left(orders, seq, key=lambda existing: seqs[id(existing)])
+        if position < len(orders) and orders[position] is order:
+            return position
+        return None
+
+    # Remove a ordem da lista `index[key]`, apagando a chave se a lista ficar vazia.
+    def _remove_indexed(self, index: dict[str, list[WashOrder]], key: str, order: WashOrder) -> None:
+        orders = index[key]
+        del orders[self._order_position(orders, order)]
+        if not orders:
+            del index[key]
+
+    # Desfaz o _index_order. As chaves que ficam sem ordens são removidas dos totais.
+    def _unindex_order(self, order: WashOrder) -> None:
+        self._remove_indexed(self._orders_by_owner, order.car.owner_cpf, order)
+        for name in dict.fromkeys(service.name for service in order.services):
+            self._remove_indexed(self._orders_by_service, name, order)
+            if name not in self._orders_by_service:
+                del self._revenue_by_service[name]
+        for service in order.services:
+            if service.name in self._revenue_by_service:
+                self._revenue_by_service[service.name] -= service.price
+
+        day = order.created_at.date()
+        total = order.total_price
+        self._revenue -= total
+        self._orders_by_day[day] -= 1
+        if self._orders_by_day[day]:
+            self._revenue_by_day[day] -= total
+        else:
+            del self._orders_by_day[day], self._revenue_by_day[day]
+        self._orders_by_brand[order.car.brand] -= 1
+        if not self._orders_by_brand[order.car.brand]:
+            del self._orders_by_brand[order.car.brand]
+        if not self._orders_by_day:
+            # Sem ordens, zera o total em vez de manter o resíduo das subtrações em float.
+            self._revenue = 0.0
+        del self._order_seq[id(order)]
+
+    # Adicionar um proprietário ao sistema. Se o CPF já existir, retorna o proprietário
+    # cadastrado e não altera nada. Carros já adicionados com esse CPF passam a apontar para ele.
+    def add_owner(self, owner: CarOwner) -> CarOwner:
+        registered = self._owners_by_cpf.get(owner.cpf)
+        if registered is not None:
+            return registered
+        self._index_owner(owner)
+        self.owners.append(owner)
+        if self._journal is not None:
+            self._journal.owner_added(self, owner)
+        return owner
+
+    # Adicionar um carro ao sistema. Levanta DuplicatePlateError se a placa já existir.
+    # Um proprietário recebido junto com o carro e ainda não cadastrado é adicionado antes.
     def add_car(self, car: Car) -> None:
+        if car.plate in self._cars_by_plate:
+            raise DuplicatePlateError(f"car with plate {car.plate} already exists")
+        if car.owner is not None:
+            self.add_owner(car.owner)
+        self._index_car(car)
         self.cars.append(car)
+        if self._journal is not None:
+            self._journal.car_added(self, car)
 
     # Adicionar um serviço ao sistema
     def add_service(self, service: CarWashService) -> None:
+        self._services_by_name[service.name] = service
         self.services.append(service)
+        if self._journal is not None:
+            self._journal.service_added(self, service)
 
     # Adicionar uma ordem de lavagem ao sistema
     def add_order(self, order: WashOrder) -> None:
+        self._index_order(order)
         self.orders.append(order)
+        if self._journal is not None:
+            self._journal.order_added(self, order)
+
+    # Cancelar (remover) uma ordem de lavagem, desfazendo seus totais.
+    # A ordem é identificada pelo objeto, não pela igualdade dos campos, e encontrada pelo
+    # número de sequência (busca binária), sem percorrer as ordens. Retorna False se não estiver no sistema.
+    def remove_order(self, order: WashOrder) -> bool:
+        position = self._order_position(self.orders, order)
+        if position is None:
+            return False
+        del self.orders[position]
+        self._unindex_order(order)
+        if self._journal is not None:
+            self._journal.order_removed(self, position)
+        return True
+
+    # Ligar (ou desligar, com None) o diário que recebe as alterações do sistema.
+    def attach_journal(self, journal: Any) -> None:
+        self._journal = journal
+
+    # Buscar um carro pela placa (normalizada como no validador do Car). None se não existir.
+    def get_car(self, plate: str) -> Car | None:
+        return self._cars_by_plate.get(plate.upper().strip())
+
+    # Buscar um proprietário pelo CPF. None se não existir.
+    def get_owner(self, cpf: str) -> CarOwner | None:
+        return self._owners_by_cpf.get(cpf)
+
+    # Carros de um proprietário, na ordem em que foram adicionados.
+    def cars_for_owner(self, cpf: str) -> list[Car]:
+        return list(self._cars_by_owner.get(cpf, ()))
+
+    # Buscar um serviço pelo nome. None se não existir.
+    def get_service(self, name: str) -> CarWashService | None:
+        return self._services_by_name.get(name)
+
+    # Ordens dos carros de um proprietário, na ordem em que foram adicionadas.
+    def orders_for_owner(self, cpf: str) -> list[WashOrder]:
+        return list(self._orders_by_owner.get(cpf, ()))
+
+    # Ordens que usam o serviço, na ordem em que foram adicionadas.
+    def orders_using_service(self, name: str) -> list[WashOrder]:
+        return list(self._orders_by_service.get(name, ()))
 
     # Obter os carros no sistema
     def get_cars(self) -> list[Car]:
@@ -166,14 +432,46 @@ class CarWashSystem(BaseModel):
     def get_orders(self) -> list[WashOrder]:
         return self.orders
 
-    # Obter o total de preço das ordens de lavagem no sistema
-    def get_total_price(self) -> PositiveFloat:
-        return sum(order.total_price for order in self.orders)
+    # Serializar as ordens para JSON (uma lista). Com flat=True, cada ordem vira uma FlatWashOrder,
+    # com placa e CPF no lugar do carro e do proprietário, e nomes no lugar dos serviços.
+    # Com service_keys=True, os serviços saem como chaves do catálogo (ver load_orders_json).
+    def dump_orders_json(self, flat: bool = False, service_keys: bool = False) -> bytes:
+        if flat:
+            return FLAT_ORDERS_ADAPTER.dump_json([order.to_flat_row() for order in self.orders])
+        return ORDERS_ADAPTER.dump_json(self.orders, context={"service_keys": service_keys})
+
+    # Validar uma ordem resolvendo as chaves de serviço no catálogo do sistema (sem adicioná-la).
+    def validate_order(self, data: Any) -> WashOrder:
+        return WashOrder.model_validate(data, context={"catalog": self._services_by_name})
+
+    # Validar e adicionar uma lista de ordens em JSON, com serviços por chave ou completos.
+    def load_orders_json(self, data: str | bytes) -> list[WashOrder]:
+        orders = ORDERS_ADAPTER.validate_json(data, context={"catalog": self._services_by_name})
+        for order in orders:
+            self.add_order(order)
+        return orders
+
+    # Obter o total de preço das ordens de lavagem no sistema (total mantido, O(1))
+    def get_total_price(self) -> float:
+        return self._revenue
+
+    # Receita por nome de serviço
+    def get_revenue_by_service(self) -> dict[str, float]:
+        return dict(self._revenue_by_service)
+
+    # Receita por dia (data de created_at da ordem)
+    def get_revenue_by_day(self) -> dict[date, float]:
+        return dict(self._revenue_by_day)
+
+    # Quantidade de ordens por marca do carro
+    def get_order_count_by_brand(self) -> dict[CarBrand, int]:
+        return dict(self._orders_by_brand)
 
     # Obter o total de preço dos serviços no sistema
     def get_total_price_of_services(self) -> PositiveFloat:
         return sum(service.price for service in self.services)
 
+
 def main():
     print("\n=== Pydantic practice: Car Wash ===")
 
@@ -241,6 +539,10 @@ def main():
     print(order_ok.model_dump())
     print("model_dump_json():")
     print(order_ok.model_dump_json())
+    # O carro sai como objeto aninhado, com o proprietário só como referência (owner_cpf).
+    dumped = json.loads(order_ok.model_dump_json())
+    assert dumped["car"]["plate"] == "AAA1234" and dumped["car"]["owner_cpf"] == owner.cpf
+    assert "owner" not in dumped["car"] and "cars" not in json.loads(owner.model_dump_json())
 
     # Opcional: usar a classe sistema com uma ordem de lavagem válida
     print("\n6) CarWashSystem aggregate")
@@ -251,5 +553,142 @@ def main():
     car_wash_system.add_order(order_ok)
     print(f"System total order price: {car_wash_system.get_total_price()}")
 
+    # 7) Índices: busca por placa, proprietário e serviço, e placa duplicada
+    print("\n7) Indexed lookups")
+    assert car_wash_system.get_car(" aaa1234 ") is car_ok
+    assert car_wash_system.get_car("ZZZ9999") is None
+    assert car_wash_system.get_service("Premium Wash") is premium
+    assert car_wash_system.orders_for_owner(owner.cpf) == [order_ok]
+    assert car_wash_system.orders_using_service("Basic Wash") == [order_ok]
+    assert car_wash_system.orders_using_service("Wax") == []
+    try:
+        car_wash_system.add_car(car_ok.model_copy())
+    except DuplicatePlateError as exc:
+        print(f"Duplicate plate error: {exc}")
+    else:
+        raise AssertionError("duplicate plate should be rejected")
+    assert len(car_wash_system.get_cars()) == 1
+    try:
+        CarWashSystem(cars=[car_ok, car_ok])
+    except ValidationError as exc:
+        print(f"Duplicate plate on validation: {exc.errors()[0]['msg']}")
+    else:
+        raise AssertionError("duplicate plate should fail validation")
+    restored = CarWashSystem.model_validate(car_wash_system.model_dump())
+    assert restored.get_car("AAA1234") == car_ok
+    assert restored.orders_for_owner(owner.cpf) == [order_ok]
+    assert restored.get_total_price() == car_wash_system.get_total_price() == 35.0
+    assert json.loads(car_wash_system.dump_orders_json()) == [dumped]
+    flat = json.loads(car_wash_system.dump_orders_json(flat=True))
+    assert flat == [
+        {
+            "plate": "AAA1234",
+            "owner_cpf": owner.cpf,
+            "services": ["Basic Wash", "Premium Wash"],
+            "total_price": 35.0,
+            "created_at": order_ok.created_at.isoformat(),
+        }
+    ]
+    print(f"Flat order row: {flat[0]}")
+
+    # Catálogo: ordens com serviços por chave compartilham as instâncias do sistema
+    keyed = json.loads(car_wash_system.dump_orders_json(service_keys=True))
+    assert keyed[0]["services"] == ["Basic Wash", "Premium Wash"]
+    catalog_system = CarWashSystem(services=[basic, premium])
+    loaded = catalog_system.load_orders_json(json.dumps(keyed * 3))
+    assert all(order.services[1] is premium for order in loaded)
+    assert catalog_system.get_total_price() == 105.0
+    assert json.loads(loaded[0].model_dump_json())["services"] == dumped["services"]
+    assert catalog_system.validate_order({**keyed[0], "services": ["Basic Wash", basic.model_dump()]}).total_price == 20.0
+    for services, message in ((["Wax"], "unknown service: Wax"), (["Basic Wash"], "service keys require a service catalog")):
+        try:
+            WashOrder.model_validate({**keyed[0], "services": services}, context={"catalog": {}} if "Wax" in services else None)
+        except ValidationError as exc:
+            assert message in exc.errors()[0]["msg"]
+        else:
+            raise AssertionError("service keys must be resolved against a catalog")
+    print(f"Keyed order: {keyed[0]['services']}")
+    # Proprietário e carros ligados pelo CPF, com os carros do proprietário buscados no sistema
+    assert car_wash_system.get_owner(owner.cpf) is owner and car_ok.owner is owner
+    second = Car(brand=CarBrand.FORD, model="Ka", color=CarColor.BLUE, plate="CCC1234", owner_cpf=owner.cpf)
+    assert second.owner is None
+    car_wash_system.add_car(second)
+    assert second.owner is owner and car_wash_system.cars_for_owner(owner.cpf) == [car_ok, second]
+    assert restored.cars_for_owner(owner.cpf) == [restored.get_car("AAA1234")]
+    # Copiar ou serializar uma ordem não leva o sistema junto, e o mesmo proprietário
+    # pode estar em dois sistemas.
+    import pickle
+
+    assert len(pickle.dumps(order_ok)) < 2_000
+    assert order_ok.model_copy(deep=True).car.owner == owner
+    other_system = CarWashSystem(owners=[owner])
+    assert other_system.cars_for_owner(owner.cpf) == [] and len(car_wash_system.cars_for_owner(owner.cpf)) == 2
+    try:
+        Car(brand=CarBrand.FORD, model="Ka", color=CarColor.BLUE, plate="DDD1234")
+    except ValidationError as exc:
+        print(f"Car without owner: {exc.errors()[0]['loc']} {exc.errors()[0]['msg']}")
+    # Dois carros com cópias do mesmo proprietário compartilham o proprietário cadastrado.
+    copy_system = CarWashSystem()
+    for plate in ("EEE1234", "FFF1234"):
+        copy_system.add_car(Car(brand=CarBrand.BMW, model="X1", color=CarColor.RED, plate=plate, owner=owner.model_dump()))
+    assert len(copy_system.owners) == 1 and all(car.owner is copy_system.owners[0] for car in copy_system.cars)
+    print(f"Car by plate: {restored.get_car('AAA1234').model} / orders for owner: {len(restored.orders_for_owner(owner.cpf))}")
+
+    # 8) Totais mantidos x recálculo sobre todas as ordens, com adições e cancelamentos aleatórios
+    print("\n8) Running totals")
+    check_running_totals(seed=7, steps=500)
+    assert car_wash_system.remove_order(order_ok) and not car_wash_system.remove_order(order_ok)
+    assert car_wash_system.get_total_price() == 0.0 and car_wash_system.get_revenue_by_service() == {}
+    print("Running totals match the recomputed totals")
+
+
+# Recalcula os totais percorrendo todas as ordens (caminho antigo, usado como referência).
+def recompute_totals(orders: list[WashOrder]) -> tuple[float, dict, dict, dict]:
+    by_service: dict[str, float] = {}
+    by_day: dict[date, float] = {}
+    by_brand: dict[CarBrand, int] = {}
+    for order in orders:
+        for service in order.services:
+            by_service[service.name] = by_service.get(service.name, 0.0) + service.price
+        day = order.created_at.date()
+        by_day[day] = by_day.get(day, 0.0) + order.total_price
+        by_brand[order.car.brand] = by_brand.get(order.car.brand, 0) + 1
+    return sum(order.total_price for order in orders), by_service, by_day, by_brand
+
+
+def check_running_totals(seed: int, steps: int) -> None:
+    import math
+    import random
+
+    def close(a: float, b: float) -> bool:
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+    def same(running: dict, expected: dict) -> bool:
+        return running.keys() == expected.keys() and all(close(running[key], expected[key]) for key in expected)
+
+    rng = random.Random(seed)
+    services = [CarWashService(name=f"Service {index}", price=rng.choice([9.9, 15.0, 22.5, 30.1])) for index in range(5)]
+    owner = CarOwner(name="Jane", email="jane@example.com", phone="1", cpf="1")
+    cars = [
+        Car(brand=rng.choice(list(CarBrand)), model="X", color=CarColor.RED, plate=f"AAA{index:04d}", owner=owner)
+        for index in range(20)
+    ]
+    system = CarWashSystem()
+    for _ in range(steps):
+        if system.orders and rng.random() < 0.4:
+            assert system.remove_order(rng.choice(system.orders))
+        else:
+            order = WashOrder(
+                car=rng.choice(cars),
+                services=rng.choices(services, k=rng.randint(1, 3)),
+                created_at=datetime(2026, 1, rng.randint(1, 5), rng.randint(0, 23)),
+            )
+            system.add_order(order)
+        total, by_service, by_day, by_brand = recompute_totals(system.orders)
+        assert close(system.get_total_price(), total)
+        assert same(system.get_revenue_by_service(), by_service)
+        assert same(system.get_revenue_by_day(), by_day)
+        assert system.get_order_count_by_brand() == by_brand
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
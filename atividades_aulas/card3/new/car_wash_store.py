@@ -0,0 +1,348 @@
+"""
+Persistência do CarWashSystem: log de alterações só de acréscimo + snapshots.
+
+Cada alteração feita por `add_owner`, `add_car`, `add_service`, `add_order` e `remove_order` é
+escrita numa linha NDJSON do log da geração atual (`log-NNNNNN.ndjson`). O `fsync`
+é feito em lote: a cada `fsync_every` registros, e no máximo `fsync_interval` segundos
+depois do primeiro registro ainda não sincronizado (um timer em segundo plano cobre o caso
+de uma escrita seguida de silêncio), e sempre em `sync()`/`close()`. Uma queda pode perder
+só os registros ainda não sincronizados.
+
+A cada `snapshot_every` registros (ou chamando `snapshot()`), o estado inteiro é
+gravado de forma compacta em `snapshot-NNNNNN.json` (cada proprietário e cada carro uma vez; as ordens
+referenciam carros pela placa e serviços pela chave do catálogo) e começa uma nova
+geração de log. Arquivos de gerações anteriores são apagados.
+
+Na inicialização, `load()` lê o snapshot mais recente e reaplica só o log da geração
+dele. Uma última linha incompleta (queda no meio da escrita) é descartada.
+
+Uso:
+
+    store = CarWashStore("data/")
+    system = store.load()
+    system.add_car(car)      # já fica no log
+    store.close()
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from car_wash import Car, CarOwner, CarWashService, CarWashSystem, WashOrder
+
+SNAPSHOT_PREFIX = "snapshot-"
+LOG_PREFIX = "log-"
+
+
+# Registro de uma ordem (no log e no snapshot). O carro vai pela placa quando é o carro
+# cadastrado no sistema, e cada serviço pela chave quando é a instância do catálogo.
+# Um carro fora do sistema vai inteiro; como Car.owner não é serializado, o proprietário
+# vai junto no carro quando não é o cadastrado no sistema, para não se perder no reload.
+def order_record(system: CarWashSystem, order: WashOrder) -> dict[str, Any]:
+    record: dict[str, Any] = {}
+    car = order.car
+    if system.get_car(car.plate) is car:
+        record["plate"] = car.plate
+    else:
+        record["car"] = car.model_dump(mode="json")
+        if car.owner is not None and system.get_owner(car.owner_cpf) is not car.owner:
+            record["car"]["owner"] = car.owner.model_dump(mode="json")
+    record["services"] = [
+        service.name if system.get_service(service.name) is service else service.model_dump(mode="json")
+        for service in order.services
+    ]
+    record["created_at"] = order.created_at.isoformat()
+    return record
+
+
+# Valida uma ordem a partir do registro, resolvendo placa e chaves de serviço no sistema.
+def order_from_record(system: CarWashSystem, record: dict[str, Any]) -> WashOrder:
+    data = dict(record)
+    plate = data.pop("plate", None)
+    if plate is not None:
+        car = system.get_car(plate)
+        if car is None:
+            raise ValueError(f"order references unknown car {plate}")
+        data["car"] = car
+    return system.validate_order(data)
+
+
+class CarWashStore:
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        fsync_every: int = 100,
+        fsync_interval: float = 1.0,
+        snapshot_every: int | None = 10_000,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.generation = 0
+        self.system: CarWashSystem | None = None
+        self._log = None
+        self._pending = 0
+        self._records = 0
+        # O timer do fsync roda em outra thread: escrita, fsync e troca do arquivo de log
+        # são feitos sob este lock.
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def _path(self, prefix: str, generation: int) -> Path:
+        suffix = ".json" if prefix == SNAPSHOT_PREFIX else ".ndjson"
+        return self.directory / f"{prefix}{generation:06d}{suffix}"
+
+    def _generations(self, prefix: str) -> list[int]:
+        numbers = (path.stem[len(prefix):] for path in self.directory.glob(f"{prefix}*"))
+        return sorted(int(number) for number in numbers if number.isdigit())
+
+    # Carrega o snapshot mais recente, reaplica o log da geração dele e passa a registrar as alterações.
+    def load(self) -> CarWashSystem:
+        snapshots = self._generations(SNAPSHOT_PREFIX)
+        system = CarWashSystem()
+        if snapshots:
+            self.generation = snapshots[-1]
+            self._restore(system, json.loads(self._path(SNAPSHOT_PREFIX, self.generation).read_bytes()))
+        self._records = self._replay(system, self._path(LOG_PREFIX, self.generation))
+        self._log = open(self._path(LOG_PREFIX, self.generation), "ab")
+        self.system = system
+        system.attach_journal(self)
+        return system
+
+    def _restore(self, system: CarWashSystem, snapshot: dict[str, Any]) -> None:
+        for service in snapshot["services"]:
+            system.add_service(CarWashService.model_validate(service))
+        for owner in snapshot["owners"]:
+            system.add_owner(CarOwner.model_validate(owner))
+        for car in snapshot["cars"]:
+            system.add_car(Car.model_validate(car))
+        for record in snapshot["orders"]:
+            system.add_order(order_from_record(system, record))
+
+    # Reaplica o log no sistema (ainda sem diário). Retorna quantos registros foram aplicados.
+    def _replay(self, system: CarWashSystem, path: Path) -> int:
+        if not path.exists():
+            return 0
+        applied = 0
+        good_offset = 0
+        with open(path, "rb") as stream:
+            for line in stream:
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(system, json.loads(line))
+                good_offset += len(line)
+                applied += 1
+        if good_offset != path.stat().st_size:
+            # Queda no meio de uma escrita: descarta a linha incompleta.
+            with open(path, "r+b") as stream:
+                stream.truncate(good_offset)
+        return applied
+
+    def _apply(self, system: CarWashSystem, record: dict[str, Any]) -> None:
+        kind = record["type"]
+        if kind == "owner":
+            system.add_owner(CarOwner.model_validate(record["owner"]))
+        elif kind == "car":
+            system.add_car(Car.model_validate(record["car"]))
+        elif kind == "service":
+            system.add_service(CarWashService.model_validate(record["service"]))
+        elif kind == "order":
+            system.add_order(order_from_record(system, record["order"]))
+        elif kind == "remove_order":
+            order = system.orders[record["position"]]
+            system.remove_order(order)
+        else:
+            raise ValueError(f"unknown log record type: {kind}")
+
+    # Métodos do diário, chamados pelo CarWashSystem depois de cada alteração.
+    def owner_added(self, system: CarWashSystem, owner: CarOwner) -> None:
+        self._append({"type": "owner", "owner": owner.model_dump(mode="json")})
+
+    def car_added(self, system: CarWashSystem, car: Car) -> None:
+        self._append({"type": "car", "car": car.model_dump(mode="json")})
+
+    def service_added(self, system: CarWashSystem, service: CarWashService) -> None:
+        self._append({"type": "service", "service": service.model_dump(mode="json")})
+
+    def order_added(self, system: CarWashSystem, order: WashOrder) -> None:
+        self._append({"type": "order", "order": order_record(system, order)})
+
+    def order_removed(self, system: CarWashSystem, position: int) -> None:
+        self._append({"type": "remove_order", "position": position})
+
+    def _append(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        with self._lock:
+            self._log.write(line)
+            self._pending += 1
+            self._records += 1
+            if self._pending >= self.fsync_every:
+                self._sync()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.fsync_interval, self._sync_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if self.snapshot_every and self._records >= self.snapshot_every:
+            self.snapshot()
+
+    # Grava no disco os registros pendentes do log.
+    def sync(self) -> None:
+        with self._lock:
+            self._sync()
+
+    # Chamado com o lock já adquirido.
+    def _sync(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._log is None:
+            return
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._pending = 0
+
+    def _sync_on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            if self._pending:
+                self._sync()
+
+    # Grava o snapshot do estado atual e começa uma nova geração de log.
+    # O snapshot é escrito num arquivo temporário e renomeado, então nunca fica pela metade.
+    # Levanta RuntimeError se o store não estiver aberto (antes de load() ou depois de close()).
+    def snapshot(self) -> Path:
+        if self._log is None:
+            raise RuntimeError("store is closed: call load() before snapshot()")
+        system = self.system
+        snapshot = {
+            "services": [service.model_dump(mode="json") for service in system.services],
+            "owners": [owner.model_dump(mode="json") for owner in system.owners],
+            "cars": [car.model_dump(mode="json") for car in system.cars],
+            "orders": [order_record(system, order) for order in system.orders],
+        }
+        generation = self.generation + 1
+        path = self._path(SNAPSHOT_PREFIX, generation)
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as stream:
+            stream.write(json.dumps(snapshot, separators=(",", ":")).encode())
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.replace(temporary, path)
+
+        with self._lock:
+            self._sync()
+            self._log.close()
+            previous = self.generation
+            self.generation = generation
+            self._log = open(self._path(LOG_PREFIX, generation), "ab")
+            self._records = 0
+        for old in range(previous, generation):
+            for prefix in (SNAPSHOT_PREFIX, LOG_PREFIX):
+                self._path(prefix, old).unlink(missing_ok=True)
+        return path
+
+    # Pode ser chamado mais de uma vez.
+    def close(self) -> None:
+        with self._lock:
+            if self._log is None:
+                return
+            self._sync()
+            self._log.close()
+            self._log = None
+        if self.system is not None:
+            self.system.attach_journal(None)
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    from car_wash import CarColor, CarOwner
+
+    owner = CarOwner(name="John Doe", email="john.doe@example.com", phone="1234567890", cpf="1234567890")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = CarWashStore(directory, fsync_every=3, snapshot_every=None)
+        system = store.load()
+        basic = CarWashService(name="Basic Wash", price=10.0)
+        system.add_service(basic)
+        system.add_service(CarWashService(name="Premium Wash", price=25.0))
+        cars = [
+            Car(brand="toyota", model="Corolla", color=CarColor.WHITE, plate=f"AAA{index:04d}", owner=owner)
+            for index in range(5)
+        ]
+        for car in cars:
+            system.add_car(car)
+        orders = [WashOrder(car=car, services=[basic, system.get_service("Premium Wash")]) for car in cars]
+        orders.append(WashOrder(car=cars[0].model_copy(update={"plate": "ZZZ9999"}), services=[basic]))
+        for order in orders:
+            system.add_order(order)
+        system.remove_order(orders[1])
+        # Carro e proprietário fora do sistema: o proprietário vai no registro da ordem.
+        ann = CarOwner(name="Ann", email="ann@example.com", phone="1", cpf="999")
+        outside = Car(brand="honda", model="Fit", color=CarColor.RED, plate="YYY1234", owner=ann)
+        system.add_order(WashOrder(car=outside, services=[basic]))
+        store.close()
+
+        # Recarregar só com o log.
+        reloaded_store = CarWashStore(directory, snapshot_every=None)
+        reloaded = reloaded_store.load()
+        assert reloaded.dump_orders_json() == system.dump_orders_json()
+        assert reloaded.get_total_price() == system.get_total_price() == 160.0
+        assert reloaded.orders[-1].car.owner == ann, "the owner of an unregistered car must survive a reload"
+        assert reloaded.orders[0].services[0] is reloaded.get_service("Basic Wash")
+        assert reloaded.get_car("AAA0003").owner == owner and len(reloaded.cars_for_owner(owner.cpf)) == 5
+
+        # Snapshot + cauda do log.
+        reloaded_store.snapshot()
+        check_store = CarWashStore(directory, snapshot_every=None)
+        assert check_store.load().orders[-1].car.owner == ann, "and a snapshot"
+        check_store.close()
+        reloaded.remove_order(reloaded.orders[0])
+        reloaded.add_order(WashOrder(car=reloaded.get_car("AAA0004"), services=[reloaded.get_service("Basic Wash")]))
+        expected = reloaded.dump_orders_json()
+        reloaded_store.close()
+        assert sorted(path.name for path in Path(directory).iterdir()) == ["log-000001.ndjson", "snapshot-000001.json"]
+
+        # Queda no meio de uma escrita: a linha incompleta é descartada.
+        with open(Path(directory) / "log-000001.ndjson", "ab") as log:
+            log.write(b'{"type":"car","car":{"bra')
+        store = CarWashStore(directory, snapshot_every=None)
+        system = store.load()
+        assert system.dump_orders_json() == expected
+        assert len(system.get_cars()) == 5 and system.get_car("AAA0001").owner.name == "John Doe" and system.get_order_count_by_brand() == {"toyota": 5, "honda": 1}
+
+        # Snapshots automáticos: 2 registros reaplicados + 10 novos = 3 snapshots de 4 registros.
+        store.snapshot_every = 4
+        for index in range(10):
+            system.add_order(WashOrder(car=system.get_car("AAA0002"), services=[system.get_service("Premium Wash")]))
+        store.close()
+        store.close()
+        assert store.generation == 4
+        try:
+            store.snapshot()
+        except RuntimeError as exc:
+            assert "closed" in str(exc)
+        else:
+            raise AssertionError("snapshot() after close() should fail clearly")
+        final = CarWashStore(directory).load()
+        assert final.dump_orders_json() == system.dump_orders_json()
+        assert final.get_total_price() == system.get_total_price()
+
+        # Uma escrita seguida de silêncio é sincronizada pelo timer, sem esperar outra escrita.
+        store = CarWashStore(directory, fsync_every=1000, fsync_interval=0.05)
+        system = store.load()
+        system.add_service(CarWashService(name="Wax", price=15.0))
+        assert store._pending == 1
+        deadline = time.monotonic() + 2
+        while store._pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert store._pending == 0 and store._timer is None, "fsync_interval must bound unsynced records"
+        store.close()
+
+    print("store checks passed")
@@ -0,0 +1,113 @@
+"""
+Grafo de amizades e bloqueios.
+
+As listas `friends` e `blocked` do `User` são listas de UUIDs, então cada verificação
+de pertinência é uma busca linear. Aqui as relações ficam num índice de adjacência
+(`dict[UUID, set[UUID]]`): verificar, adicionar e remover custam O(1), e consultas
+como amigos em comum e amigos de amigos são operações de conjunto.
+
+- Amizade é simétrica: adicionar A -> B também adiciona B -> A.
+- Bloqueio é direcional: A bloquear B não significa que B bloqueou A.
+  Bloquear desfaz a amizade, e não é possível ser amigo de quem bloqueou ou foi bloqueado.
+"""
+
+from typing import AbstractSet, Iterable
+from uuid import UUID
+
+# Limite de amigos (e de bloqueados) por usuário.
+MAX_FRIENDS = 5000
+
+EMPTY: frozenset[UUID] = frozenset()
+
+
+# Erro levantado quando a amizade envolve um bloqueio em qualquer direção.
+class BlockedError(ValueError):
+    pass
+
+
+# Erro levantado quando o usuário atingiu o limite de amigos ou de bloqueados.
+class FriendLimitError(ValueError):
+    pass
+
+
+# Serialização compacta de uma lista de ids: 16 bytes por UUID, em ordem.
+def pack_ids(ids: Iterable[UUID]) -> bytes:
+    return b"".join(value.bytes for value in sorted(ids))
+
+
+# Índice de adjacência em memória para amizades e bloqueios.
+class FriendGraph:
+
+    def __init__(self) -> None:
+        self._friends: dict[UUID, set[UUID]] = {}
+        self._blocked: dict[UUID, set[UUID]] = {}
+
+    # Amigos do usuário. O conjunto retornado não deve ser alterado.
+    def friends(self, user_id: UUID) -> AbstractSet[UUID]:
+        return self._friends.get(user_id, EMPTY)
+
+    # Usuários bloqueados pelo usuário. O conjunto retornado não deve ser alterado.
+    def blocked(self, user_id: UUID) -> AbstractSet[UUID]:
+        return self._blocked.get(user_id, EMPTY)
+
+    def are_friends(self, user_id: UUID, other_id: UUID) -> bool:
+        return other_id in self._friends.get(user_id, EMPTY)
+
+    def is_blocked(self, user_id: UUID, other_id: UUID) -> bool:
+        return other_id in self._blocked.get(user_id, EMPTY)
+
+    def add_friend(self, user_id: UUID, friend_id: UUID) -> None:
+        if self.is_blocked(user_id, friend_id) or self.is_blocked(friend_id, user_id):
+            raise BlockedError("users have blocked each other")
+        if self.are_friends(user_id, friend_id):
+            return
+        for one, other in ((user_id, friend_id), (friend_id, user_id)):
+            if len(self.friends(one)) >= MAX_FRIENDS:
+                raise FriendLimitError(f"user {one} already has {MAX_FRIENDS} friends")
+        self._friends.setdefault(user_id, set()).add(friend_id)
+        self._friends.setdefault(friend_id, set()).add(user_id)
+
+    # Desfaz a amizade. Retorna False se os usuários não eram amigos.
+    def remove_friend(self, user_id: UUID, friend_id: UUID) -> bool:
+        if not self.are_friends(user_id, friend_id):
+            return False
+        self._friends[user_id].discard(friend_id)
+        self._friends[friend_id].discard(user_id)
+        return True
+
+    def block(self, user_id: UUID, blocked_id: UUID) -> None:
+        blocked = self._blocked.setdefault(user_id, set())
+        if blocked_id not in blocked and len(blocked) >= MAX_FRIENDS:
+            raise FriendLimitError(f"user {user_id} already blocked {MAX_FRIENDS} users")
+        blocked.add(blocked_id)
+        self.remove_friend(user_id, blocked_id)
+
+    # Remove o bloqueio. Retorna False se o usuário não estava bloqueado.
+    def unblock(self, user_id: UUID, blocked_id: UUID) -> bool:
+        if not self.is_blocked(user_id, blocked_id):
+            return False
+        self._blocked[user_id].discard(blocked_id)
+        return True
+
+    # Amigos em comum: interseção dos dois conjuntos, percorrendo o menor.
+    def mutual_friends(self, user_id: UUID, other_id: UUID) -> set[UUID]:
+        first, second = self.friends(user_id), self.friends(other_id)
+        if len(first) > len(second):
+            first, second = second, first
+        return {friend for friend in first if friend in second}
+
+    # Amigos de amigos que ainda não são amigos do usuário, sem o próprio usuário
+    # e sem os usuários que ele bloqueou.
+    def friends_of_friends(self, user_id: UUID) -> set[UUID]:
+        direct = self.friends(user_id)
+        candidates: set[UUID] = set()
+        for friend in direct:
+            candidates.update(self.friends(friend))
+        candidates -= direct
+        candidates -= self.blocked(user_id)
+        candidates.discard(user_id)
+        return candidates
+
+    def clear(self) -> None:
+        self._friends.clear()
+        self._blocked.clear()
@@ -0,0 +1,275 @@
+"""
+Métricas de latência por rota, no formato texto do Prometheus.
+
+Uso (opcional, antes de declarar as rotas):
+
+    metrics = Metrics(enabled=True)
+    instrument(app, metrics)
+
+Com isso:
+
+- `MetricsMiddleware` mede o tempo total de cada requisição
+  (`http_request_duration_seconds{method, route, status}`).
+- `TimedRoute` divide o tempo de cada rota em fases
+  (`http_request_phase_seconds{method, route, phase}`):
+  - `validation`: leitura do corpo e validação dos parâmetros (ex.: `CreateUserRequest`);
+  - `handler`: execução da função do endpoint;
+  - `serialization`: validação e serialização do `response_model`.
+- `metrics.span("nome")` mede trechos dentro do handler (hash de senha, buscas...) e
+  grava na mesma métrica de fases, com a rota da requisição atual.
+- `GET /metrics` devolve tudo em texto do Prometheus.
+
+Desabilitado, `span` devolve um context manager vazio e nada é registrado.
+Habilitado, o custo é de algumas chamadas a `perf_counter` e de um `bisect` por
+observação, na ordem de poucos microssegundos por requisição.
+"""
+
+import asyncio
+import contextvars
+import functools
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterator
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+
+# Limites dos buckets dos histogramas, em segundos.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_DURATION = "http_request_duration_seconds"
+REQUEST_PHASE = "http_request_phase_seconds"
+HELP = {
+    REQUEST_DURATION: "Total request latency by route.",
+    REQUEST_PHASE: "Request latency by route and phase (validation, handler, serialization, spans).",
+}
+
+
+# Histograma com buckets fixos. Guarda a contagem de cada bucket (não acumulada).
+class Histogram:
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Tempos da requisição atual, preenchidos pela TimedRoute e pelo endpoint.
+class RequestTimings:
+
+    __slots__ = ("method", "route", "handler_start", "handler_end")
+
+    def __init__(self, method: str, route: str) -> None:
+        self.method = method
+        self.route = route
+        self.handler_start: float | None = None
+        self.handler_end: float | None = None
+
+
+_NULL_SPAN = nullcontext()
+
+_current_request: contextvars.ContextVar[RequestTimings | None] = contextvars.ContextVar(
+    "current_request_timings", default=None
+)
+
+
+# Registro de histogramas por métrica e labels.
+class Metrics:
+
+    def __init__(self, enabled: bool = True, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms: dict[str, dict[tuple[tuple[str, str], ...], Histogram]] = {}
+
+    # Histograma da série (criado na primeira vez). Quem observa com frequência guarda a referência.
+    def series(self, metric: str, labels: tuple[tuple[str, str], ...]) -> Histogram:
+        series = self._histograms.setdefault(metric, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, metric: str, labels: tuple[tuple[str, str], ...], seconds: float) -> None:
+        self.series(metric, labels).observe(seconds)
+
+    def observe_phase(self, method: str, route: str, phase: str, seconds: float) -> None:
+        self.observe(REQUEST_PHASE, (("method", method), ("route", route), ("phase", phase)), seconds)
+
+    # Mede um trecho de código como uma fase da requisição atual.
+    def span(self, phase: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(phase)
+
+    @contextmanager
+    def _span(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            timings = _current_request.get()
+            if timings is None:
+                self.observe_phase("", "", phase, elapsed)
+            else:
+                self.observe_phase(timings.method, timings.route, phase, elapsed)
+
+    def histogram(self, metric: str, **labels: str) -> Histogram | None:
+        return self._histograms.get(metric, {}).get(tuple(labels.items()))
+
+    def clear(self) -> None:
+        self._histograms.clear()
+
+    # Formato texto do Prometheus (buckets acumulados, _sum e _count).
+    def render(self) -> str:
+        lines = []
+        for metric, series in self._histograms.items():
+            lines.append(f"# HELP {metric} {HELP.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, histogram in series.items():
+                label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+                cumulative = 0
+                for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{label_text}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Middleware ASGI que mede o tempo total de cada requisição HTTP.
+class MetricsMiddleware:
+
+    def __init__(self, app: Any, metrics: Metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+        # (method, route, status) -> histograma, para não montar os labels a cada requisição.
+        self._histograms: dict[tuple[str, str, str], Histogram] = {}
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            key = (scope["method"], getattr(scope.get("route"), "path", "unmatched"), status)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                labels = (("method", key[0]), ("route", key[1]), ("status", key[2]))
+                histogram = self._histograms[key] = self.metrics.series(REQUEST_DURATION, labels)
+            histogram.observe(elapsed)
+
+
+# Envolve o endpoint para marcar o início e o fim do handler na requisição atual.
+# functools.wraps mantém a assinatura, que o FastAPI usa para montar as dependências.
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed_async(*args: Any, **kwargs: Any) -> Any:
+            timings = _current_request.get()
+            if timings is not None:
+                timings.handler_start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if timings is not None:
+                    timings.handler_end = time.perf_counter()
+
+        return timed_async
+
+    @functools.wraps(endpoint)
+    def timed_sync(*args: Any, **kwargs: Any) -> Any:
+        timings = _current_request.get()
+        if timings is not None:
+            timings.handler_start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            if timings is not None:
+                timings.handler_end = time.perf_counter()
+
+    return timed_sync
+
+
+# Cria uma classe de rota que registra as fases validation/handler/serialization em `metrics`.
+def timed_route_class(metrics: Metrics) -> type[APIRoute]:
+
+    class TimedRoute(APIRoute):
+
+        def __init__(self, path: str, endpoint: Callable, **kwargs: Any) -> None:
+            super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+        def get_route_handler(self) -> Callable:
+            handler = super().get_route_handler()
+            route = self.path
+            # method -> histogramas (validation, handler, serialization) desta rota.
+            phases: dict[str, tuple[Histogram, Histogram, Histogram]] = {}
+
+            def phase_histograms(method: str) -> tuple[Histogram, Histogram, Histogram]:
+                histograms = phases.get(method)
+                if histograms is None:
+                    histograms = phases[method] = tuple(
+                        metrics.series(REQUEST_PHASE, (("method", method), ("route", route), ("phase", phase)))
+                        for phase in ("validation", "handler", "serialization")
+                    )
+                return histograms
+
+            async def timed_handler(request: Any) -> Any:
+                timings = RequestTimings(request.method, route)
+                token = _current_request.set(timings)
+                start = time.perf_counter()
+                try:
+                    return await handler(request)
+                finally:
+                    end = time.perf_counter()
+                    _current_request.reset(token)
+                    validation, handled, serialization = phase_histograms(timings.method)
+                    if timings.handler_start is None:
+                        validation.observe(end - start)
+                    else:
+                        handler_end = timings.handler_end or end
+                        validation.observe(timings.handler_start - start)
+                        handled.observe(handler_end - timings.handler_start)
+                        serialization.observe(end - handler_end)
+
+            return timed_handler
+
+    return TimedRoute
+
+
+# Liga as métricas num app FastAPI. Deve ser chamado antes de declarar as rotas,
+# pois só as rotas criadas depois usam a TimedRoute.
+def instrument(app: FastAPI, metrics: Metrics, path: str = "/metrics") -> None:
+    app.router.route_class = timed_route_class(metrics)
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    async def get_metrics() -> PlainTextResponse:
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    app.add_api_route(path, get_metrics, methods=["GET"], include_in_schema=False)
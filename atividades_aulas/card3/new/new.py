@@ -1,18 +1,47 @@
+import asyncio
+import base64
+import json
+import os
 from datetime import datetime
-from hashlib import sha256
-from typing import Optional
-from uuid import uuid4
+from typing import Any, Literal, Optional
+from uuid import UUID, uuid4
 
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.testclient import TestClient
-from pydantic import BaseModel, EmailStr, Field, SecretStr, field_serializer, field_validator, UUID4
+from pydantic import (
+    BaseModel,
+    EmailStr,
+    Field,
+    SecretStr,
+    TypeAdapter,
+    ValidationError,
+    field_serializer,
+    field_validator,
+    UUID4,
+)
+
+from metrics import Metrics, instrument
+from friend_graph import MAX_FRIENDS, BlockedError, FriendLimitError, pack_ids
+from passwords import PasswordHasher, sha256_hex
+from user_repository import (
+    DuplicateEmailError,
+    InMemoryUserRepository,
+    SqliteUserRepository,
+    UserRepository,
+    normalize_email,
+)
 
 app = FastAPI()
 
-# Converter de string para hash SHA256.
-def sha256_hex(value: str) -> str:
-    return sha256(value.encode()).hexdigest()
+# Métricas de latência por rota e por fase, expostas em /metrics (opcional: METRICS_ENABLED=1).
+metrics = Metrics(enabled=os.environ.get("METRICS_ENABLED") == "1")
+if metrics.enabled:
+    instrument(app, metrics)
+
+# Hash de senhas com KDF lenta (PBKDF2/scrypt) e sal por usuário, calculado num pool de threads.
+# O algoritmo é configurável pela variável PASSWORD_HASH_ALGORITHM.
+hasher = PasswordHasher.from_env()
 
 
 # Definindo o modelo de dados do usuário
@@ -23,16 +52,19 @@ class User(BaseModel):
         # extra: forbid indica que qualquer campo que não foi definido no modelo de dados será considerado um erro.
         "extra": "forbid",
     }
-    __users__ = []
 
     name: str = Field(..., description="Name of the user")
     email: EmailStr = Field(..., description="Email address of the user")
-    password_sha256: str = Field(..., description="Password hash (SHA256)")
+    password_hash: str = Field(..., description="Password hash (hex)")
+    password_salt: str = Field(default="", description="Per-user password salt (hex)")
+    password_algorithm: str = Field(default="sha256", description="Algorithm used to hash the password")
+    # As relações são mantidas no grafo de amizades do repositório (sets por id);
+    # estas listas são preenchidas a partir dele na leitura.
     friends: list[UUID4] = Field(
-        default_factory=list, max_length=500, description="List of friends"
+        default_factory=list, max_length=MAX_FRIENDS, description="List of friends"
     )
     blocked: list[UUID4] = Field(
-        default_factory=list, max_length=500, description="List of blocked users"
+        default_factory=list, max_length=MAX_FRIENDS, description="List of blocked users"
     )
     signup_ts: Optional[datetime] = Field(
         default_factory=datetime.now, description="Signup timestamp", kw_only=True
@@ -43,11 +75,12 @@ class User(BaseModel):
 
     # Validator que converte a senha em hash SHA256 antes de salvar.
     # Assim, a senha nunca é armazenada em texto plano.
-    @field_validator("password_sha256", mode="before")
+    # Os endpoints sempre passam um hash pronto, calculado pelo PasswordHasher.
+    @field_validator("password_hash", mode="before")
     @classmethod
     def normalize_password_hash(cls, v: str) -> str:
 
-        # Se já for um hash SHA256 (64 chars hex), não re-hashar
+        # Se já for um hash (64 chars hex), não re-hashar
         if isinstance(v, str) and len(v) == 64:
             try:
                 int(v, 16)
@@ -61,6 +94,18 @@ class User(BaseModel):
     def serialize_id(self, id: UUID4) -> str:
         return str(id)
 
+# Repositório com índices O(1) por id e por email, no lugar da lista User.__users__.
+# Se USERS_DB_PATH estiver definido, os usuários são persistidos em SQLite (compartilhado entre workers).
+def create_repository() -> UserRepository:
+    db_path = os.environ.get("USERS_DB_PATH")
+    if db_path:
+        return SqliteUserRepository(db_path, model_type=User)
+    return InMemoryUserRepository()
+
+
+users = create_repository()
+
+
 # Modelo de resposta que exclui a senha do retorno da API.
 # Isso demonstra o uso de herança e configuração de campos no Pydantic.
 class UserResponse(BaseModel):
@@ -111,70 +156,334 @@ class UpdatePasswordRequest(BaseModel):
     new_password: SecretStr
 
 
+# Validação do lote inteiro em uma única passada.
+CREATE_USERS_ADAPTER = TypeAdapter(list[CreateUserRequest])
+# Cada usuário do lote custa um hash de senha com a KDF no pool do hasher, então o lote é
+# limitado ao que uma requisição consegue terminar. O corpo é recusado pelo tamanho em bytes
+# (Content-Length ou o que já foi lido) antes de ser analisado.
+MAX_BATCH_SIZE = 1_000
+MAX_BATCH_BYTES = MAX_BATCH_SIZE * 1024
+
+
+# Erro de uma linha do lote. index é a posição da linha no corpo da requisição.
+class BatchRowError(BaseModel):
+    index: int
+    errors: list[dict]
+
+
+# Resposta da criação em lote: usuários criados e erros por linha.
+class BatchCreateUsersResponse(BaseModel):
+    created: list[UserResponse] = Field(default_factory=list)
+    errors: list[BatchRowError] = Field(default_factory=list)
+
+
 # Definição de endpoints da API com FastAPI.
 # Suas definições tem o único propósito de testar as funcionalidades definidas nos modelos do Pydantic.
 
+# Campos do usuário expostos na resposta (mesmos do UserResponse).
+USER_RESPONSE_FIELDS = set(UserResponse.model_fields)
+
+
+# Serializa usuários um a um em NDJSON, sem montar o documento JSON inteiro em memória.
+def iter_users_ndjson():
+    for user in users:
+        yield user.model_dump_json(include=USER_RESPONSE_FIELDS) + "\n"
+
+
+# Tamanho da página quando só o cursor é informado.
+DEFAULT_PAGE_SIZE = 100
+
+
+# Lista paginada por cursor, em ordem de criação. O cursor da próxima página vai no
+# header X-Next-Cursor (ausente na última página). Sem limit nem cursor, devolve todos os
+# usuários, como antes da paginação.
+# Com format=ndjson, todos os usuários são exportados em streaming, um por linha.
 @app.get("/users", response_model=list[UserResponse])
-async def get_users() -> list[UserResponse]:
-    return list(User.__users__)
+async def get_users(
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: int | None = Query(None, ge=0),
+    format: Literal["json", "ndjson"] = "json",
+) -> list[UserResponse] | StreamingResponse:
+    if format == "ndjson":
+        return StreamingResponse(iter_users_ndjson(), media_type="application/x-ndjson")
+    if limit is None and cursor is None:
+        return users.list_all()
+
+    page, next_cursor = users.list_page(limit or DEFAULT_PAGE_SIZE, cursor)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return page
 
 
 @app.post("/users", response_model=UserResponse)
 async def create_user(user: CreateUserRequest):
+    with metrics.span("password_hash"):
+        password = await hasher.hash_async(user.password.get_secret_value())
     new_user = User(
         name=user.name,
         email=user.email,
-        password_sha256=sha256_hex(user.password.get_secret_value()),
+        password_hash=password.hash,
+        password_salt=password.salt,
+        password_algorithm=password.algorithm,
     )
-    User.__users__.append(new_user)
+    try:
+        users.add(new_user)
+    except DuplicateEmailError:
+        return JSONResponse(status_code=409, content={"message": "Email already registered"})
     return new_user
 
 
+# Lê o corpo do lote como objetos indexados pela posição no corpo. Aceita um array JSON
+# (posição no array) ou NDJSON (um usuário por linha; posição da linha a partir de 0, contando
+# as linhas em branco, que são ignoradas). Linhas NDJSON que não são JSON válido viram erros da própria linha.
+def parse_batch_body(body: bytes, content_type: str) -> tuple[dict[int, Any], dict[int, list[dict]]]:
+    errors: dict[int, list[dict]] = {}
+    if content_type.startswith("application/x-ndjson"):
+        rows = {}
+        for index, line in enumerate(body.splitlines()):
+            if not line.strip():
+                continue
+            try:
+                rows[index] = json.loads(line)
+            except json.JSONDecodeError as exc:
+                rows[index] = None
+                errors[index] = [{"type": "json_invalid", "loc": [], "msg": f"Invalid JSON: {exc.msg}"}]
+        return rows, errors
+
+    parsed = json.loads(body)
+    if not isinstance(parsed, list):
+        raise ValueError("body must be a JSON array or NDJSON")
+    return dict(enumerate(parsed)), errors
+
+
+# Valida todas as linhas de uma vez com o TypeAdapter. Se houver erros, eles são agrupados
+# por linha e apenas as linhas válidas são validadas de novo (segunda passada só no caso de erro).
+def validate_batch(rows: dict[int, Any], errors: dict[int, list[dict]]) -> dict[int, CreateUserRequest]:
+    candidates = [index for index in rows if index not in errors]
+    try:
+        validated = CREATE_USERS_ADAPTER.validate_python([rows[index] for index in candidates])
+        return dict(zip(candidates, validated))
+    except ValidationError as exc:
+        for error in exc.errors(include_url=False, include_context=False, include_input=False):
+            position, *loc = error["loc"]
+            errors.setdefault(candidates[position], []).append({**error, "loc": loc})
+    valid = [index for index in candidates if index not in errors]
+    validated = CREATE_USERS_ADAPTER.validate_python([rows[index] for index in valid])
+    return dict(zip(valid, validated))
+
+
+# Lê o corpo do lote, parando assim que passar de MAX_BATCH_BYTES. Retorna None se passar.
+async def read_batch_body(request: Request) -> bytes | None:
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > MAX_BATCH_BYTES:
+        return None
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BATCH_BYTES:
+            return None
+    return bytes(body)
+
+
+# Criação de usuários em lote (array JSON ou NDJSON). As senhas são processadas em paralelo
+# no pool do hasher e todos os usuários válidos são gravados de uma vez. Linhas inválidas ou com
+# email repetido (no lote ou já cadastrado) são devolvidas em "errors" sem abortar o lote.
+@app.post("/users:batch", response_model=BatchCreateUsersResponse)
+async def create_users_batch(request: Request):
+    body = await read_batch_body(request)
+    if body is None:
+        return JSONResponse(status_code=413, content={"message": f"Batch body is limited to {MAX_BATCH_BYTES} bytes"})
+    try:
+        rows, errors = parse_batch_body(body, request.headers.get("content-type", ""))
+    except ValueError as exc:
+        return JSONResponse(status_code=422, content={"message": str(exc)})
+    if len(rows) > MAX_BATCH_SIZE:
+        return JSONResponse(status_code=413, content={"message": f"Batch is limited to {MAX_BATCH_SIZE} users"})
+
+    requests_by_index = validate_batch(rows, errors)
+
+    # Emails repetidos são detectados pelo índice do repositório e por um set do próprio lote.
+    accepted: list[tuple[int, CreateUserRequest]] = []
+    seen_emails: set[str] = set()
+    for index, user in requests_by_index.items():
+        email = normalize_email(user.email)
+        if email in seen_emails or users.get_by_email(email, relations=False) is not None:
+            errors[index] = [{"type": "duplicate_email", "loc": ["email"], "msg": "Email already registered"}]
+            continue
+        seen_emails.add(email)
+        accepted.append((index, user))
+
+    with metrics.span("password_hash"):
+        passwords = await asyncio.gather(
+            *(hasher.hash_async(user.password.get_secret_value()) for _, user in accepted)
+        )
+    # Os dados já foram validados pelo CreateUserRequest, então o User é montado sem revalidação.
+    new_users = [
+        User.model_construct(
+            name=user.name,
+            email=user.email,
+            password_hash=password.hash,
+            password_salt=password.salt,
+            password_algorithm=password.algorithm,
+        )
+        for (_, user), password in zip(accepted, passwords)
+    ]
+
+    rejected = set(users.add_many(new_users))
+    for position in rejected:
+        errors[accepted[position][0]] = [
+            {"type": "duplicate_email", "loc": ["email"], "msg": "Email already registered"}
+        ]
+
+    return BatchCreateUsersResponse(
+        created=[
+            UserResponse.model_validate(user, from_attributes=True)
+            for position, user in enumerate(new_users)
+            if position not in rejected
+        ],
+        errors=[BatchRowError(index=index, errors=errors[index]) for index in sorted(errors)],
+    )
+
+
 @app.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(user_id: UUID4) -> UserResponse | JSONResponse:
-    try:
-        return next((user for user in User.__users__ if user.id == user_id))
-    except StopIteration:
+    user = users.get(user_id)
+    if user is None:
         return JSONResponse(status_code=404, content={"message": "User not found"})
+    return user
 
 
 @app.post("/login")
 async def login(request: LoginRequest):
-    password_hash = sha256_hex(request.password.get_secret_value())
-    try:
-        user = next(
-            u for u in User.__users__
-            if u.email == request.email and u.password_sha256 == password_hash
-        )
-        return {"message": "Login successful", "user_id": str(user.id)}
-    except StopIteration:
+    with metrics.span("lookup"):
+        user = users.get_by_email(request.email, relations=False)
+    if user is None:
+        return JSONResponse(status_code=401, content={"message": "Invalid credentials"})
+    with metrics.span("password_verify"):
+        valid = await hasher.verify_async(request.password.get_secret_value(), user)
+    if not valid:
         return JSONResponse(status_code=401, content={"message": "Invalid credentials"})
+    return {"message": "Login successful", "user_id": str(user.id)}
 
 
 @app.put("/users/{user_id}/password")
 async def update_password(user_id: UUID4, request: UpdatePasswordRequest):
-    try:
-        user = next(u for u in User.__users__ if u.id == user_id)
-    except StopIteration:
+    user = users.get(user_id, relations=False)
+    if user is None:
         return JSONResponse(status_code=404, content={"message": "User not found"})
 
-    current_hash = sha256_hex(request.current_password.get_secret_value())
-    if user.password_sha256 != current_hash:
+    with metrics.span("password_verify"):
+        valid = await hasher.verify_async(request.current_password.get_secret_value(), user)
+    if not valid:
         return JSONResponse(status_code=401, content={"message": "Current password is incorrect"})
 
-    new_hash = sha256_hex(request.new_password.get_secret_value())
+    # O novo hash usa o algoritmo configurado e um sal novo.
+    with metrics.span("password_hash"):
+        new_password = await hasher.hash_async(request.new_password.get_secret_value())
     # Recria o usuário com a nova senha (Pydantic models são imutáveis por padrão).
-    updated_user = user.model_copy(update={"password_sha256": new_hash})
-    idx = User.__users__.index(user)
-    User.__users__[idx] = updated_user
+    users.update_password(user_id, new_password.hash, new_password.salt, new_password.algorithm)
     return {"message": "Password updated successfully"}
 
 
+# --- Amizades e bloqueios ---
+# As relações ficam no índice de adjacência do repositório, então verificar, adicionar
+# e remover custam O(1) e não dependem do tamanho das listas.
+
+# Resposta com a lista de amigos. Com compact=true, os ids vêm concatenados
+# (16 bytes cada) e codificados em base64, em vez de uma lista de strings.
+class FriendsResponse(BaseModel):
+    count: int
+    friends: list[UUID4] | None = None
+    packed: str | None = None
+
+
+def user_not_found() -> JSONResponse:
+    return JSONResponse(status_code=404, content={"message": "User not found"})
+
+
+# Verifica se os dois usuários existem e não são o mesmo. Retorna uma resposta de erro ou None.
+def check_pair(user_id: UUID, other_id: UUID) -> JSONResponse | None:
+    if user_id == other_id:
+        return JSONResponse(status_code=400, content={"message": "A user cannot relate to themselves"})
+    if not users.exists(user_id) or not users.exists(other_id):
+        return user_not_found()
+    return None
+
+
+@app.get("/users/{user_id}/friends", response_model=FriendsResponse, response_model_exclude_none=True)
+async def get_friends(user_id: UUID4, compact: bool = False):
+    if not users.exists(user_id):
+        return user_not_found()
+    friends = users.friends(user_id)
+    if compact:
+        return FriendsResponse(count=len(friends), packed=base64.b64encode(pack_ids(friends)).decode())
+    return FriendsResponse(count=len(friends), friends=sorted(friends))
+
+
+@app.get("/users/{user_id}/friends/{friend_id}")
+async def check_friend(user_id: UUID4, friend_id: UUID4):
+    if not users.exists(user_id) or not users.exists(friend_id):
+        return user_not_found()
+    return {"friends": users.are_friends(user_id, friend_id)}
+
+
+@app.put("/users/{user_id}/friends/{friend_id}")
+async def add_friend(user_id: UUID4, friend_id: UUID4):
+    if error := check_pair(user_id, friend_id):
+        return error
+    try:
+        users.add_friend(user_id, friend_id)
+    except (BlockedError, FriendLimitError) as exc:
+        return JSONResponse(status_code=409, content={"message": str(exc)})
+    return {"message": "Friend added"}
+
+
+@app.delete("/users/{user_id}/friends/{friend_id}")
+async def remove_friend(user_id: UUID4, friend_id: UUID4):
+    if not users.remove_friend(user_id, friend_id):
+        return JSONResponse(status_code=404, content={"message": "Users are not friends"})
+    return {"message": "Friend removed"}
+
+
+@app.put("/users/{user_id}/blocked/{blocked_id}")
+async def block_user(user_id: UUID4, blocked_id: UUID4):
+    if error := check_pair(user_id, blocked_id):
+        return error
+    try:
+        users.block(user_id, blocked_id)
+    except FriendLimitError as exc:
+        return JSONResponse(status_code=409, content={"message": str(exc)})
+    return {"message": "User blocked"}
+
+
+@app.delete("/users/{user_id}/blocked/{blocked_id}")
+async def unblock_user(user_id: UUID4, blocked_id: UUID4):
+    if not users.unblock(user_id, blocked_id):
+        return JSONResponse(status_code=404, content={"message": "User is not blocked"})
+    return {"message": "User unblocked"}
+
+
+@app.get("/users/{user_id}/mutual-friends/{other_id}", response_model=list[UUID4])
+async def get_mutual_friends(user_id: UUID4, other_id: UUID4):
+    if not users.exists(user_id) or not users.exists(other_id):
+        return user_not_found()
+    return sorted(users.mutual_friends(user_id, other_id))
+
+
+# Sugestões de amizade: amigos de amigos, limitados aos `limit` primeiros em ordem de id.
+@app.get("/users/{user_id}/friends-of-friends", response_model=list[UUID4])
+async def get_friends_of_friends(user_id: UUID4, limit: int = Query(100, ge=1, le=1000)):
+    if not users.exists(user_id):
+        return user_not_found()
+    return sorted(users.friends_of_friends(user_id))[:limit]
+
+
 # Testes para o endpoint realizados com o TestClient.
 def main() -> None:
     with TestClient(app) as client:
-        # Limpa a lista de usuários antes dos testes
-        User.__users__.clear()
+        # Limpa o repositório de usuários antes dos testes
+        users.clear()
 
         for i in range(5):
             response = client.post(
@@ -196,6 +505,29 @@ def main() -> None:
         for u in response.json():
             assert "password" not in u, "Password should not be in list response"
 
+        # Paginação por cursor: 2 + 2 + 1 usuários, na ordem de criação
+        names = []
+        response = client.get("/users", params={"limit": 2})
+        while True:
+            assert response.status_code == 200
+            names.extend(u["name"] for u in response.json())
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if next_cursor is None:
+                break
+            response = client.get("/users", params={"limit": 2, "cursor": next_cursor})
+        assert names == [f"User {i}" for i in range(5)], "Pages should follow creation order"
+
+        response = client.get("/users", params={"limit": 0})
+        assert response.status_code == 422, "Limit must be positive"
+
+        # Exportação em NDJSON: um usuário por linha, sem senha
+        response = client.get("/users", params={"format": "ndjson"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [UserResponse.model_validate_json(line) for line in response.text.splitlines()]
+        assert [u.name for u in lines] == names, "NDJSON export should contain every user"
+        assert "password" not in response.text, "Password should not be in NDJSON export"
+
         response = client.post(
             "/users", json={"name": "User 5", "email": "example5@arjancodes.com", "password": "secret123"}
         )
@@ -266,13 +598,161 @@ def main() -> None:
         )
         assert response.status_code == 404, "Should return not found"
 
-        # Verifica que a senha é armazenada como hash SHA256 (não texto plano)
-        user_obj = next(u for u in User.__users__ if str(u.id) == user_5_id)
-        stored_password = user_obj.password_sha256
-        assert len(stored_password) == 64, "Password should be stored as SHA256 hash"
-        assert stored_password == sha256("newsecret456".encode()).hexdigest(), (
-            "Stored hash should match SHA256 of the password"
+        # Email duplicado (mesmo com maiúsculas diferentes) é rejeitado pelo índice
+        response = client.post(
+            "/users", json={"name": "User 5b", "email": "EXAMPLE5@arjancodes.com", "password": "abc"}
         )
+        assert response.status_code == 409, "Duplicate email should be rejected"
+
+        # Login é feito pelo email normalizado
+        response = client.post("/login", json={"email": "Example5@ArjanCodes.com", "password": "newsecret456"})
+        assert response.status_code == 200, "Login should ignore email case"
+
+        # --- Testes de amizades e bloqueios ---
+        ids = [client.get("/users", params={"limit": 5}).json()[i]["id"] for i in range(5)]
+        a, b, c, d, e = ids
+        for one, other in ((a, b), (a, c), (b, c), (c, d)):
+            response = client.put(f"/users/{one}/friends/{other}")
+            assert response.status_code == 200, "Friendship should be created"
+
+        # Amizade é simétrica e aparece no usuário
+        assert client.get(f"/users/{b}/friends/{a}").json() == {"friends": True}
+        assert client.get(f"/users/{a}/friends/{d}").json() == {"friends": False}
+        assert sorted(client.get(f"/users/{a}").json()["friends"]) == sorted([b, c])
+        # Verificações de existência e login não leem as relações
+        assert users.exists(UUID(a)) and not users.exists(uuid4())
+        assert users.get(UUID(a), relations=False).friends == []
+        response = client.get(f"/users/{c}/friends")
+        assert response.json()["count"] == 3 and sorted(response.json()["friends"]) == sorted([a, b, d])
+
+        # Forma compacta: 16 bytes por id, em base64
+        response = client.get(f"/users/{c}/friends", params={"compact": True})
+        assert response.json()["count"] == 3
+        assert len(base64.b64decode(response.json()["packed"])) == 3 * 16
+
+        # Amigos em comum e amigos de amigos
+        assert client.get(f"/users/{a}/mutual-friends/{b}").json() == [c]
+        # Usuário inexistente é 404, como nos outros endpoints de amizade
+        assert client.get(f"/users/{a}/friends/{uuid4()}").status_code == 404
+        assert client.get(f"/users/{uuid4()}/mutual-friends/{b}").status_code == 404
+        assert client.get(f"/users/{a}/friends-of-friends").json() == [d]
+
+        # Bloquear desfaz a amizade e impede que ela seja refeita
+        response = client.put(f"/users/{d}/blocked/{c}")
+        assert response.status_code == 200
+        assert client.get(f"/users/{c}/friends/{d}").json() == {"friends": False}
+        assert client.get(f"/users/{d}").json()["blocked"] == [c]
+        response = client.put(f"/users/{c}/friends/{d}")
+        assert response.status_code == 409, "Blocked users cannot become friends"
+        assert client.get(f"/users/{a}/friends-of-friends").json() == []
+        assert client.delete(f"/users/{d}/blocked/{c}").status_code == 200
+        assert client.delete(f"/users/{d}/blocked/{c}").status_code == 404
+
+        # Remover amizade
+        assert client.delete(f"/users/{a}/friends/{b}").status_code == 200
+        assert client.delete(f"/users/{a}/friends/{b}").status_code == 404
+        assert client.get(f"/users/{a}/mutual-friends/{b}").json() == [c]
+
+        # Erros: usuário inexistente e relação consigo mesmo
+        assert client.put(f"/users/{a}/friends/{uuid4()}").status_code == 404
+        assert client.put(f"/users/{e}/friends/{e}").status_code == 400
+
+        # --- Testes de criação em lote ---
+        # Array JSON: linhas inválidas e emails repetidos viram erros por linha, sem abortar o lote
+        response = client.post(
+            "/users:batch",
+            json=[
+                {"name": "Batch 0", "email": "batch0@test.com", "password": "b0"},
+                {"name": "Batch 1", "email": "wrong", "password": "b1"},
+                {"name": "Batch 2", "email": "BATCH0@test.com", "password": "b2"},
+                {"name": "Batch 3", "email": "example5@arjancodes.com", "password": "b3"},
+                {"name": "Batch 4", "email": "batch4@test.com"},
+                {"name": "Batch 5", "email": "batch5@test.com", "password": "b5"},
+            ],
+        )
+        assert response.status_code == 200
+        assert [u["name"] for u in response.json()["created"]] == ["Batch 0", "Batch 5"]
+        assert [e["index"] for e in response.json()["errors"]] == [1, 2, 3, 4]
+        assert response.json()["errors"][0]["errors"][0]["loc"] == ["email"]
+        assert response.json()["errors"][1]["errors"][0]["type"] == "duplicate_email"
+        for u in response.json()["created"]:
+            assert "password_hash" not in u, "Password should not be in batch response"
+
+        response = client.post("/login", json={"email": "batch5@test.com", "password": "b5"})
+        assert response.status_code == 200, "Users created in batch should be able to log in"
+
+        # NDJSON: uma linha por usuário; JSON malformado é erro apenas da própria linha,
+        # indicada pela posição no corpo (linhas em branco contam, mas são ignoradas)
+        body = "\n".join(
+            [
+                json.dumps({"name": "Batch 6", "email": "batch6@test.com", "password": "b6"}),
+                "",
+                "{not json",
+                json.dumps({"name": "Batch 7", "email": "batch7@test.com", "password": "b7"}),
+            ]
+        )
+        response = client.post("/users:batch", content=body, headers={"content-type": "application/x-ndjson"})
+        assert response.status_code == 200
+        assert [u["name"] for u in response.json()["created"]] == ["Batch 6", "Batch 7"]
+        assert response.json()["errors"][0]["index"] == 2
+        assert response.json()["errors"][0]["errors"][0]["type"] == "json_invalid"
+
+        response = client.post("/users:batch", json={"name": "not a list"})
+        assert response.status_code == 422, "Batch body must be a list"
+
+        # Lotes grandes são recusados antes de analisar o corpo (pelo tamanho) ou das senhas (pelas linhas)
+        before = len(users)
+        oversized = [{"name": "x", "email": f"big{i}@test.com", "password": "p" * 1200} for i in range(MAX_BATCH_SIZE)]
+        response = client.post("/users:batch", json=oversized)
+        assert response.status_code == 413, "Body over MAX_BATCH_BYTES should be rejected"
+        too_many = [{"name": "x", "email": f"many{i}@test.com", "password": "p"} for i in range(MAX_BATCH_SIZE + 1)]
+        response = client.post("/users:batch", json=too_many)
+        assert response.status_code == 413 and len(users) == before, "Too many rows should be rejected"
+
+        # Verifica que a senha é armazenada como hash com sal (não texto plano)
+        user_obj = users.get(UUID(user_5_id))
+        assert user_obj.password_algorithm == hasher.algorithm, "Password should use the configured algorithm"
+        assert len(user_obj.password_hash) == 64, "Password should be stored as a hex hash"
+        assert user_obj.password_hash != sha256_hex("newsecret456"), "Password should not be a plain SHA256"
+        assert hasher.verify("newsecret456", user_obj), "Stored hash should match the password"
+
+        # Depois de um login bem-sucedido, a mesma senha é verificada pelo cache, sem rodar a KDF
+        assert hasher.cache.check(user_obj.id, "newsecret456", user_obj.password_hash), "Login should be cached"
+        assert not hasher.cache.check(user_obj.id, "wrong", user_obj.password_hash), "Cache must check the password"
+
+        # O sal é por usuário: a mesma senha gera hashes diferentes
+        first, second = hasher.hash("same"), hasher.hash("same")
+        assert first.salt != second.salt and first.hash != second.hash, "Each hash should have its own salt"
+
+        # Hashes SHA256 antigos (sem sal) continuam verificáveis
+        legacy_user = User(name="Legacy", email="legacy@test.com", password_hash="legacy-pass")
+        assert legacy_user.password_hash == sha256_hex("legacy-pass")
+        assert hasher.verify("legacy-pass", legacy_user), "Legacy SHA256 hashes should still verify"
+
+        # Sem limit nem cursor, GET /users continua devolvendo todos os usuários
+        extra = [User(name=f"Extra {i}", email=f"extra{i}@test.com", password_hash="x") for i in range(DEFAULT_PAGE_SIZE)]
+        assert users.add_many(extra) == []
+        response = client.get("/users")
+        assert len(response.json()) == len(users) > DEFAULT_PAGE_SIZE, "Unpaginated request should return every user"
+        assert "X-Next-Cursor" not in response.headers
+        response = client.get("/users", params={"cursor": 0})
+        assert len(response.json()) == DEFAULT_PAGE_SIZE and "X-Next-Cursor" in response.headers
+
+        # --- Testes de métricas (somente com METRICS_ENABLED=1) ---
+        if metrics.enabled:
+            response = client.get("/metrics")
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/plain")
+            text = response.text
+            assert '# TYPE http_request_duration_seconds histogram' in text
+            assert 'http_request_duration_seconds_count{method="POST",route="/users",status="200"}' in text
+            for phase in ("validation", "handler", "serialization", "password_hash"):
+                assert f'http_request_phase_seconds_count{{method="POST",route="/users",phase="{phase}"}}' in text
+            assert 'http_request_phase_seconds_count{method="POST",route="/login",phase="password_verify"}' in text
+            handled = metrics.histogram("http_request_phase_seconds", method="POST", route="/users", phase="handler")
+            assert handled.count == 7, "Every POST /users that passed validation should be timed"
+            invalid = metrics.histogram("http_request_duration_seconds", method="POST", route="/users", status="422")
+            assert invalid.count == 2, "Validation errors should be counted with their status"
 
         print("All tests passed!")
 
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import csv
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterable
+
+from order_import import Order
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+ORDER_COLUMNS = ("id", "created_at", "customer_name", "customer_email", "coupon", "total")
+ITEM_COLUMNS = ("order_id", "sku", "quantity", "unit_price")
+FORMATS = ("auto", "parquet", "npz", "csv")
+
+
+@dataclass
+class OrderColumns:
+    # Column buffers for one batch: one list per column, orders and flattened items
+    # (linked by order_id). Cleared after every flush, so memory is bounded by the batch.
+    # created_at is stored in UTC: aware values are converted and naive values are taken
+    # to be UTC already, so one column never mixes naive and aware timestamps.
+    orders: dict[str, list[Any]] = field(default_factory=lambda: {name: [] for name in ORDER_COLUMNS})
+    items: dict[str, list[Any]] = field(default_factory=lambda: {name: [] for name in ITEM_COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.orders["id"])
+
+    def append(self, order: Order) -> None:
+        columns = self.orders
+        columns["id"].append(order.id)
+        columns["created_at"].append(_to_utc(order.created_at))
+        columns["customer_name"].append(order.customer.name)
+        columns["customer_email"].append(order.customer.email)
+        columns["coupon"].append(order.coupon)
+        columns["total"].append(order.total)
+        items = self.items
+        for item in order.items:
+            items["order_id"].append(order.id)
+            items["sku"].append(item.sku)
+            items["quantity"].append(item.quantity)
+            items["unit_price"].append(item.unit_price)
+
+    def clear(self) -> None:
+        for column in (*self.orders.values(), *self.items.values()):
+            column.clear()
+
+
+class ParquetOrderWriter:
+    # orders.parquet and items.parquet, one row group per batch.
+    # Money columns are decimal128, so amounts stay exact; created_at is timestamp[us, UTC].
+
+    def __init__(self, directory: Path) -> None:
+        self.paths = [directory / "orders.parquet", directory / "items.parquet"]
+        self.order_schema = pa.schema(
+            [
+                ("id", pa.string()),
+                ("created_at", pa.timestamp("us", tz="UTC")),
+                ("customer_name", pa.string()),
+                ("customer_email", pa.string()),
+                ("coupon", pa.string()),
+                ("total", pa.decimal128(20, 2)),
+            ]
+        )
+        self.item_schema = pa.schema(
+            [
+                ("order_id", pa.string()),
+                ("sku", pa.string()),
+                ("quantity", pa.int64()),
+                ("unit_price", pa.decimal128(10, 2)),
+            ]
+        )
+        self.order_writer = pq.ParquetWriter(self.paths[0], self.order_schema)
+        self.item_writer = pq.ParquetWriter(self.paths[1], self.item_schema)
+
+    def write(self, batch: OrderColumns) -> None:
+        self.order_writer.write_table(pa.Table.from_pydict(batch.orders, schema=self.order_schema))
+        self.item_writer.write_table(pa.Table.from_pydict(batch.items, schema=self.item_schema))
+
+    def close(self) -> None:
+        self.order_writer.close()
+        self.item_writer.close()
+
+
+class NpzOrderWriter:
+    # One orders-NNNNN.npz and items-NNNNN.npz pair per batch (npz files can't be appended to).
+    # Money columns are stored as int64 cents to keep them exact. datetime64 has no time
+    # zone, so created_at holds the UTC wall-clock time.
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.paths: list[Path] = []
+
+    def write(self, batch: OrderColumns) -> None:
+        part = len(self.paths) // 2
+        orders, items = batch.orders, batch.items
+        order_path = self.directory / f"orders-{part:05d}.npz"
+        item_path = self.directory / f"items-{part:05d}.npz"
+        np.savez(
+            order_path,
+            id=np.array(orders["id"], dtype=str),
+            created_at=np.array(
+                [created_at.replace(tzinfo=None) for created_at in orders["created_at"]], dtype="datetime64[us]"
+            ),
+            customer_name=np.array(orders["customer_name"], dtype=str),
+            customer_email=np.array(orders["customer_email"], dtype=str),
+            coupon=np.array(["" if coupon is None else coupon for coupon in orders["coupon"]], dtype=str),
+            total_cents=np.array([_to_cents(total) for total in orders["total"]], dtype=np.int64),
+        )
+        np.savez(
+            item_path,
+            order_id=np.array(items["order_id"], dtype=str),
+            sku=np.array(items["sku"], dtype=str),
+            quantity=np.array(items["quantity"], dtype=np.int64),
+            unit_price_cents=np.array([_to_cents(price) for price in items["unit_price"]], dtype=np.int64),
+        )
+        self.paths += [order_path, item_path]
+
+    def close(self) -> None:
+        pass
+
+
+class CsvOrderWriter:
+    # orders.csv and items.csv, appended batch by batch. Decimals are written as text.
+
+    def __init__(self, directory: Path) -> None:
+        self.paths = [directory / "orders.csv", directory / "items.csv"]
+        self.files = [open(path, "w", newline="", encoding="utf-8") for path in self.paths]
+        self.order_csv, self.item_csv = (csv.writer(file) for file in self.files)
+        self.order_csv.writerow(ORDER_COLUMNS)
+        self.item_csv.writerow(ITEM_COLUMNS)
+
+    def write(self, batch: OrderColumns) -> None:
+        orders = batch.orders
+        orders_rows = zip(*(orders[name] for name in ORDER_COLUMNS))
+        self.order_csv.writerows(
+            (order_id, created_at.isoformat(), name, email, coupon or "", total)
+            for order_id, created_at, name, email, coupon, total in orders_rows
+        )
+        self.item_csv.writerows(zip(*(batch.items[name] for name in ITEM_COLUMNS)))
+
+    def close(self) -> None:
+        for file in self.files:
+            file.close()
+
+
+WRITERS = {"parquet": ParquetOrderWriter, "npz": NpzOrderWriter, "csv": CsvOrderWriter}
+
+
+@dataclass
+class ExportResult:
+    format: str
+    orders: int
+    items: int
+    batches: int
+    paths: list[Path]
+
+
+def _to_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _to_cents(value: Decimal) -> int:
+    return int(value.scaleb(2).to_integral_value())
+
+
+def resolve_format(format: str = "auto") -> str:
+    if format not in FORMATS:
+        raise ValueError(f"unknown export format: {format}")
+    if format == "auto":
+        return "parquet" if pa is not None else "npz" if np is not None else "csv"
+    if format == "parquet" and pa is None:
+        raise RuntimeError("parquet export requires pyarrow")
+    if format == "npz" and np is None:
+        raise RuntimeError("npz export requires numpy")
+    return format
+
+
+def export_orders(
+    orders: Iterable[Order],
+    directory: str | os.PathLike[str],
+    batch_size: int = 10_000,
+    format: str = "auto",
+) -> ExportResult:
+    # Columnar export of a stream of orders (e.g. from iter_orders) into `directory`:
+    # Parquet when pyarrow is installed, else NumPy .npz, else CSV. Only `batch_size`
+    # orders are buffered at a time.
+    format = resolve_format(format)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    writer = WRITERS[format](directory)
+    batch = OrderColumns()
+    result = ExportResult(format, orders=0, items=0, batches=0, paths=[])
+
+    def flush() -> None:
+        writer.write(batch)
+        result.orders += len(batch)
+        result.items += len(batch.items["order_id"])
+        result.batches += 1
+        batch.clear()
+
+    try:
+        for order in orders:
+            batch.append(order)
+            if len(batch) >= batch_size:
+                flush()
+        if len(batch):
+            flush()
+    finally:
+        writer.close()
+    result.paths = list(writer.paths)
+    return result
+
+
+if __name__ == "__main__":
+    import tempfile
+    import warnings
+
+    from order_import import parse_orders
+
+    raw = {
+        "id": "A100",
+        "created_at": "2026-02-08T10:30:00",
+        "customer": {"name": "Ana", "email": "ana@example.com"},
+        "items": [
+            {"sku": "SKU-1", "quantity": 2, "unit_price": "19.90"},
+            {"sku": "SKU-2", "quantity": 1, "unit_price": "5.50"},
+        ],
+    }
+    # Naive and aware timestamps in the same batch: both end up as the same UTC instant.
+    orders = parse_orders(
+        [{**raw, "id": f"A{index}"} for index in range(4)] + [{**raw, "id": "A4", "created_at": "2026-02-08T07:30:00-03:00"}]
+    )
+    for name in ("parquet", "npz", "csv"):
+        try:
+            resolve_format(name)
+        except RuntimeError as exc:
+            print(f"{name}: skipped ({exc})")
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                result = export_orders(orders, directory, batch_size=2, format=name)
+            assert (result.orders, result.items, result.batches) == (5, 10, 3)
+            if name == "parquet":
+                created_at = pq.read_table(result.paths[0]).column("created_at")
+                assert str(created_at.type) == "timestamp[us, tz=UTC]"
+                assert set(created_at.to_pylist()) == {datetime(2026, 2, 8, 10, 30, tzinfo=timezone.utc)}
+            elif name == "npz":
+                with np.load(result.paths[-2]) as last:
+                    assert last["created_at"][0] == np.datetime64("2026-02-08T10:30:00")
+            print(f"{name}: {result.orders} orders, {result.items} items in {result.batches} batches")
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-from datetime import datetime
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
 from decimal import Decimal
-from typing import Any
+from functools import cached_property, lru_cache
+from typing import IO, Any, Iterable, Iterator
 
 from pydantic import (
     BaseModel,
     ConfigDict,
     EmailStr,
     Field,
+    TypeAdapter,
     ValidationError,
     computed_field,
     condecimal,
@@ -17,6 +23,7 @@ from pydantic import (
     field_validator,
     model_validator,
 )
+from typing_extensions import TypedDict
 
 
 class Customer(BaseModel):
@@ -57,11 +64,25 @@ class Order(BaseModel):
             raise ValueError("order must have at least one item")
         return value
 
+    # Computed once (first read, usually by the coupon validator) and cached on the instance.
+    # Assigning `items` or copying with an `items` update drops the cached value; mutating
+    # the list in place does not, so replace the list instead.
     @computed_field
-    @property
+    @cached_property
     def total(self) -> Decimal:
         return sum(item.quantity * item.unit_price for item in self.items)
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name == "items":
+            self.__dict__.pop("total", None)
+
+    def model_copy(self, *, update: dict[str, Any] | None = None, deep: bool = False) -> "Order":
+        copied = super().model_copy(update=update, deep=deep)
+        if update and "items" in update:
+            copied.__dict__.pop("total", None)
+        return copied
+
     @model_validator(mode="after")
     def coupon_requires_min_total(self) -> "Order":
         if self.coupon and self.total < Decimal("30.00"):
@@ -81,10 +102,134 @@ class ShippingLabel(BaseModel):
         return value.strftime("%Y-%m-%d")
 
 
+# Same keys (aliases) and value types as ShippingLabel.model_dump(by_alias=True).
+class ShippingLabelDict(TypedDict):
+    orderId: str
+    createdAt: str
+    email: str
+
+
+SHIPPING_LABEL_ADAPTER = TypeAdapter(ShippingLabelDict)
+
+
 def parse_orders(raw_orders: list[dict[str, Any]]) -> list[Order]:
     return [Order.model_validate(raw) for raw in raw_orders]
 
 
+# Compact, picklable form of a validated order, sent back by the worker processes:
+# (id, created_at, customer name, customer email, coupon, ((sku, quantity, unit_price), ...)).
+OrderRow = tuple[str, datetime, str, str, str | None, tuple[tuple[str, int, Decimal], ...]]
+
+
+def _order_to_row(order: Order) -> OrderRow:
+    return (
+        order.id,
+        order.created_at,
+        order.customer.name,
+        order.customer.email,
+        order.coupon,
+        tuple((item.sku, item.quantity, item.unit_price) for item in order.items),
+    )
+
+
+def _order_from_row(row: OrderRow) -> Order:
+    order_id, created_at, name, email, coupon, items = row
+    # The row was produced by a successful validation, so it is rebuilt without validating again.
+    return Order.model_construct(
+        id=order_id,
+        created_at=created_at,
+        customer=Customer.model_construct(name=name, email=email),
+        items=[
+            Item.model_construct(sku=sku, quantity=quantity, unit_price=unit_price)
+            for sku, quantity, unit_price in items
+        ],
+        coupon=coupon,
+    )
+
+
+def _validate_chunk(chunk: list[dict[str, Any]]) -> tuple[list[OrderRow], int | None]:
+    # Stops at the first invalid record and returns its index within the chunk.
+    # ValidationError itself can't always be pickled, so the parent re-raises it.
+    rows = []
+    for index, raw in enumerate(chunk):
+        try:
+            order = Order.model_validate(raw)
+        except ValidationError:
+            return rows, index
+        rows.append(_order_to_row(order))
+    return rows, None
+
+
+def parse_orders_parallel(
+    raw_orders: list[dict[str, Any]],
+    chunk_size: int = 1000,
+    max_workers: int | None = None,
+) -> list[Order]:
+    # Same result as parse_orders (including raising the first ValidationError in input
+    # order), with the chunks validated in a process pool. Output keeps the input order.
+    starts = range(0, len(raw_orders), chunk_size)
+    chunks = [raw_orders[start:start + chunk_size] for start in starts]
+    orders: list[Order] = []
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        for start, (rows, failed) in zip(starts, executor.map(_validate_chunk, chunks)):
+            orders.extend(_order_from_row(row) for row in rows)
+            if failed is not None:
+                Order.model_validate(raw_orders[start + failed])
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return orders
+
+
+def revenue_by_customer(orders: Iterable[Order]) -> dict[str, Decimal]:
+    # One dict update per order, using the cached totals (no loop over items).
+    revenue: dict[str, Decimal] = {}
+    for order in orders:
+        email = order.customer.email
+        revenue[email] = revenue.get(email, Decimal(0)) + order.total
+    return revenue
+
+
+def revenue_by_sku(orders: Iterable[Order]) -> dict[str, Decimal]:
+    # Single pass over the flattened item rows of every order.
+    revenue: dict[str, Decimal] = {}
+    for item in (item for order in orders for item in order.items):
+        revenue[item.sku] = revenue.get(item.sku, Decimal(0)) + item.quantity * item.unit_price
+    return revenue
+
+
+def iter_orders(
+    source: str | os.PathLike[str] | IO[bytes] | IO[str],
+    dead_letters: IO[str] | None = None,
+) -> Iterator[Order]:
+    # Reads NDJSON one line at a time, so memory stays flat regardless of file size.
+    # Invalid lines don't stop the import: each one is written to `dead_letters` as
+    # {"line": <1-based line number>, "errors": [...], "raw": "<original line>"}.
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as stream:
+            yield from iter_orders(stream, dead_letters)
+        return
+
+    for line_number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield Order.model_validate_json(line)
+        except ValidationError as exc:
+            if dead_letters is not None:
+                dead_letters.write(_dead_letter(line_number, line, exc))
+
+
+def _dead_letter(line_number: int, line: bytes | str, exc: ValidationError) -> str:
+    raw = line.decode("utf-8", errors="replace") if isinstance(line, bytes) else line
+    record = {
+        "line": line_number,
+        "errors": exc.errors(include_url=False, include_context=False, include_input=False),
+        "raw": raw.rstrip("\r\n"),
+    }
+    return json.dumps(record, default=str) + "\n"
+
+
 def serialize_public_order(order: Order) -> dict[str, Any]:
     return order.model_dump(
         mode="json",
@@ -101,6 +246,36 @@ def serialize_shipping_label(order: Order) -> dict[str, Any]:
     return label.model_dump(by_alias=True)
 
 
+@lru_cache(maxsize=4096)
+def _label_date(day: date) -> str:
+    return day.strftime("%Y-%m-%d")
+
+
+def shipping_labels(orders: Iterable[Order]) -> list[ShippingLabelDict]:
+    # Batch version of serialize_shipping_label for trusted, already-validated orders:
+    # no ShippingLabel per order (the email was validated by Customer), and each day is
+    # formatted once. Output is equal to calling serialize_shipping_label on every order.
+    return [
+        {
+            "orderId": order.id,
+            "createdAt": _label_date(order.created_at.date()),
+            "email": order.customer.email,
+        }
+        for order in orders
+    ]
+
+
+def write_shipping_labels(orders: Iterable[Order], stream: IO[bytes]) -> int:
+    # One label per line (NDJSON), byte-identical to ShippingLabel.model_dump_json(by_alias=True).
+    # Returns the number of labels written.
+    count = 0
+    dump_json = SHIPPING_LABEL_ADAPTER.dump_json
+    for label in shipping_labels(orders):
+        stream.write(dump_json(label) + b"\n")
+        count += 1
+    return count
+
+
 if __name__ == "__main__":
     valid_raw = [
         {
@@ -136,3 +311,50 @@ if __name__ == "__main__":
         parse_orders(invalid_raw)
     except ValidationError as exc:
         print(exc)
+
+    order = orders[0]
+    assert order.total == Decimal("45.30") and order.__dict__["total"] == Decimal("45.30")
+    order.items = order.items[:1]
+    assert order.total == Decimal("39.80"), "assigning items must invalidate the cached total"
+    assert order.model_copy(update={"items": order.items * 2}).total == Decimal("79.60")
+    assert revenue_by_customer(orders * 2) == {"ana@example.com": Decimal("79.60")}
+    assert revenue_by_sku(orders * 2) == {"SKU-1": Decimal("79.60")}
+
+    parallel = parse_orders_parallel(valid_raw * 5, chunk_size=2, max_workers=2)
+    assert [serialize_public_order(order) for order in parallel] == [
+        serialize_public_order(order) for order in parse_orders(valid_raw * 5)
+    ]
+    try:
+        parse_orders_parallel(valid_raw * 3 + invalid_raw + valid_raw, chunk_size=2, max_workers=2)
+    except ValidationError as exc:
+        assert exc.errors()[0]["loc"] == ("created_at",)
+    else:
+        raise AssertionError("invalid order should raise ValidationError")
+
+    ndjson = b"".join(
+        json.dumps(raw).encode() + b"\n" for raw in [valid_raw[0], invalid_raw[0], valid_raw[0]]
+    ) + b"{not json\n"
+    dead_letters = io.StringIO()
+    streamed = list(iter_orders(io.BytesIO(ndjson), dead_letters))
+    assert [order.id for order in streamed] == ["A100", "A100"]
+    assert [json.loads(line)["line"] for line in dead_letters.getvalue().splitlines()] == [2, 4]
+    many = parse_orders(
+        [
+            {**valid_raw[0], "id": f"L{index}", "created_at": f"2026-02-{index % 28 + 1:02d}T{index % 24:02d}:00:00+00:00"}
+            for index in range(100)
+        ]
+    )
+    assert shipping_labels(many) == [serialize_shipping_label(order) for order in many]
+    labels = io.BytesIO()
+    assert write_shipping_labels(many, labels) == len(many)
+    assert labels.getvalue() == b"".join(
+        ShippingLabel(
+            order_id=order.id,
+            created_at=order.created_at,
+            customer_email=order.customer.email,
+        ).model_dump_json(by_alias=True).encode() + b"\n"
+        for order in many
+    ), "batch labels must be byte-identical to the per-order path"
+
+    print(f"streamed {len(streamed)} orders, dead letters:")
+    print(dead_letters.getvalue(), end="")
@@ -0,0 +1,168 @@
+"""
+Hash de senhas.
+
+O hash é calculado com uma KDF propositalmente lenta (PBKDF2 ou scrypt, do hashlib)
+e com sal aleatório por usuário. Como essas funções bloqueiam por dezenas de
+milissegundos, os endpoints `async` usam `hash_async`/`verify_async`, que executam o
+cálculo num pool de threads limitado (`run_in_executor`) sem travar o event loop.
+O hashlib libera o GIL durante o PBKDF2 e o scrypt, então as threads rodam em paralelo.
+
+Algoritmos suportados:
+
+- `sha256`: SHA256 sem sal. Mantido para hashes antigos; não use para novos usuários.
+- `pbkdf2_sha256`: PBKDF2-HMAC-SHA256 (padrão).
+- `scrypt`: scrypt com n=2**14, r=8, p=1.
+
+O `LoginCache` guarda, por usuário, um HMAC da última senha aceita (com uma chave
+aleatória do processo). Um novo login com a mesma senha é verificado pelo HMAC, em
+microssegundos, sem rodar a KDF de novo. Trocar a senha invalida a entrada, pois ela
+só vale para o hash armazenado no momento em que foi criada.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple
+
+ALGORITHMS = ("sha256", "pbkdf2_sha256", "scrypt")
+DEFAULT_ALGORITHM = "pbkdf2_sha256"
+PBKDF2_ITERATIONS = 600_000
+SCRYPT_PARAMS = {"n": 2**14, "r": 8, "p": 1}
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+# Hash da senha e o necessário para verificá-lo depois (algoritmo e sal em hex).
+class PasswordHash(NamedTuple):
+    hash: str
+    salt: str
+    algorithm: str
+
+
+# Converter de string para hash SHA256.
+def sha256_hex(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+# Calcula o hash de `password` com o algoritmo e o sal (hex) informados. Bloqueante.
+def derive(password: str, salt: str, algorithm: str) -> str:
+    if algorithm == "sha256":
+        return sha256_hex(password)
+    if algorithm == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac(
+            "sha256", password.encode(), bytes.fromhex(salt), PBKDF2_ITERATIONS, dklen=KEY_BYTES
+        ).hex()
+    if algorithm == "scrypt":
+        return hashlib.scrypt(
+            password.encode(), salt=bytes.fromhex(salt), dklen=KEY_BYTES, **SCRYPT_PARAMS
+        ).hex()
+    raise ValueError(f"unknown password hash algorithm: {algorithm}")
+
+
+# Cache de logins já verificados, limitado por tamanho (LRU) e por tempo (TTL).
+class LoginCache:
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._key = secrets.token_bytes(32)
+        # user_id -> (hash armazenado, HMAC da senha, expiração)
+        self._entries: OrderedDict[Any, tuple[str, bytes, float]] = OrderedDict()
+
+    def _digest(self, password: str) -> bytes:
+        return hmac.new(self._key, password.encode(), hashlib.sha256).digest()
+
+    # True se a senha já foi aceita para este usuário e o hash armazenado não mudou.
+    def check(self, user_id: Any, password: str, stored_hash: str) -> bool:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False
+        cached_hash, digest, expires_at = entry
+        if cached_hash != stored_hash or expires_at < time.monotonic():
+            del self._entries[user_id]
+            return False
+        self._entries.move_to_end(user_id)
+        return hmac.compare_digest(digest, self._digest(password))
+
+    # Registra um login bem-sucedido.
+    def store(self, user_id: Any, password: str, stored_hash: str) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[user_id] = (stored_hash, self._digest(password), time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Calcula e verifica hashes de senha num pool de threads limitado.
+class PasswordHasher:
+
+    def __init__(
+        self,
+        algorithm: str = DEFAULT_ALGORITHM,
+        max_workers: int | None = None,
+        cache: LoginCache | None = None,
+    ) -> None:
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown password hash algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.cache = cache if cache is not None else LoginCache()
+        self._executor: ThreadPoolExecutor | None = None
+
+    # Cria o hasher a partir das variáveis de ambiente
+    # PASSWORD_HASH_ALGORITHM, PASSWORD_HASH_WORKERS, LOGIN_CACHE_SIZE e LOGIN_CACHE_TTL.
+    @classmethod
+    def from_env(cls) -> "PasswordHasher":
+        workers = os.environ.get("PASSWORD_HASH_WORKERS")
+        return cls(
+            algorithm=os.environ.get("PASSWORD_HASH_ALGORITHM", DEFAULT_ALGORITHM),
+            max_workers=int(workers) if workers else None,
+            cache=LoginCache(
+                max_size=int(os.environ.get("LOGIN_CACHE_SIZE", "1024")),
+                ttl=float(os.environ.get("LOGIN_CACHE_TTL", "300")),
+            ),
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    # Gera um hash novo, com sal aleatório. Bloqueante.
+    def hash(self, password: str) -> PasswordHash:
+        salt = "" if self.algorithm == "sha256" else secrets.token_hex(SALT_BYTES)
+        return PasswordHash(derive(password, salt, self.algorithm), salt, self.algorithm)
+
+    # Verifica a senha contra o hash armazenado no usuário. Bloqueante.
+    def verify(self, password: str, user: Any) -> bool:
+        candidate = derive(password, user.password_salt, user.password_algorithm)
+        return hmac.compare_digest(candidate, user.password_hash)
+
+    async def hash_async(self, password: str) -> PasswordHash:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self.hash, password)
+
+    # Verifica a senha fora do event loop. Logins repetidos com a senha correta
+    # são resolvidos pelo cache, sem rodar a KDF.
+    async def verify_async(self, password: str, user: Any) -> bool:
+        if self.cache.check(user.id, password, user.password_hash):
+            return True
+        loop = asyncio.get_running_loop()
+        valid = await loop.run_in_executor(self._get_executor(), self.verify, password, user)
+        if valid:
+            self.cache.store(user.id, password, user.password_hash)
+        return valid
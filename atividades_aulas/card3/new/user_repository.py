@@ -0,0 +1,680 @@
+"""
+Repositório de usuários.
+
+Substitui a lista `User.__users__` por índices em dicionário (hash), de modo que
+buscas por `id` e por `email` sejam O(1) independentemente do número de usuários.
+
+Há duas implementações da mesma interface (`UserRepository`):
+
+- `InMemoryUserRepository`: índices em dicionários, dentro do processo.
+- `SqliteUserRepository`: arquivo SQLite em modo WAL, com colunas `id` e `email`
+  indexadas. Vários workers do uvicorn podem apontar para o mesmo arquivo. A versão do
+  esquema fica em `PRAGMA user_version` e bancos de versões anteriores são migrados ao abrir.
+
+A listagem é paginada por cursor (`list_page`): a ordem é a de criação e o cursor
+aponta para a posição seguinte, então cada página custa O(limit).
+
+Amizades e bloqueios ficam fora do registro do usuário: no `FriendGraph` (memória) ou
+nas tabelas `friendships`/`blocks` (SQLite). As listas `friends` e `blocked` dos
+usuários devolvidos são preenchidas a partir dessas relações na leitura.
+"""
+
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AbstractSet, Any, Iterator
+from uuid import UUID
+
+from friend_graph import MAX_FRIENDS, BlockedError, FriendGraph, FriendLimitError
+
+
+# Erro levantado quando já existe um usuário com o mesmo email.
+class DuplicateEmailError(ValueError):
+    pass
+
+
+# Normaliza o email para ser usado como chave do índice.
+# O email é comparado sem diferenciar maiúsculas e minúsculas e sem espaços nas pontas.
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+# Interface de armazenamento dos usuários usada pelos endpoints.
+class UserRepository(ABC):
+
+    ITER_PAGE_SIZE = 500
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    # Percorre todos os usuários página a página, sem carregar a lista inteira.
+    def __iter__(self) -> Iterator[Any]:
+        cursor = None
+        while True:
+            page, cursor = self.list_page(self.ITER_PAGE_SIZE, cursor)
+            yield from page
+            if cursor is None:
+                return
+
+    # Adiciona um usuário, rejeitando emails duplicados.
+    @abstractmethod
+    def add(self, user: Any) -> Any: ...
+
+    # Adiciona vários usuários numa única operação (um único commit no SQLite).
+    # Usuários com email já cadastrado são ignorados; retorna as posições rejeitadas.
+    def add_many(self, users: list[Any]) -> list[int]:
+        rejected = []
+        for index, user in enumerate(users):
+            try:
+                self.add(user)
+            except DuplicateEmailError:
+                rejected.append(index)
+        return rejected
+
+    # Verifica se o usuário existe, sem montar o modelo nem ler as relações.
+    @abstractmethod
+    def exists(self, user_id: UUID) -> bool: ...
+
+    # Busca um usuário pelo id. Retorna None se não existir.
+    # Com relations=False, as listas friends e blocked não são preenchidas a partir das
+    # relações; use quando a resposta não as mostra (login, troca de senha).
+    @abstractmethod
+    def get(self, user_id: UUID, relations: bool = True) -> Any | None: ...
+
+    # Busca um usuário pelo email (normalizado). Retorna None se não existir.
+    @abstractmethod
+    def get_by_email(self, email: str, relations: bool = True) -> Any | None: ...
+
+    # Atualiza o hash, o sal e o algoritmo da senha. Retorna o usuário atualizado ou None se não existir.
+    @abstractmethod
+    def update_password(
+        self, user_id: UUID, password_hash: str, password_salt: str, password_algorithm: str
+    ) -> Any | None: ...
+
+    # Retorna até `limit` usuários a partir do cursor, em ordem de criação,
+    # e o cursor da próxima página (None quando não há mais usuários).
+    @abstractmethod
+    def list_page(self, limit: int, cursor: int | None = None) -> tuple[list[Any], int | None]: ...
+
+    # Remove todos os usuários.
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    # Amigos do usuário.
+    @abstractmethod
+    def friends(self, user_id: UUID) -> AbstractSet[UUID]: ...
+
+    # Usuários bloqueados pelo usuário.
+    @abstractmethod
+    def blocked(self, user_id: UUID) -> AbstractSet[UUID]: ...
+
+    @abstractmethod
+    def are_friends(self, user_id: UUID, other_id: UUID) -> bool: ...
+
+    # Cria a amizade nos dois sentidos. Levanta BlockedError ou FriendLimitError.
+    @abstractmethod
+    def add_friend(self, user_id: UUID, friend_id: UUID) -> None: ...
+
+    # Desfaz a amizade. Retorna False se os usuários não eram amigos.
+    @abstractmethod
+    def remove_friend(self, user_id: UUID, friend_id: UUID) -> bool: ...
+
+    # Bloqueia um usuário, desfazendo a amizade se existir.
+    @abstractmethod
+    def block(self, user_id: UUID, blocked_id: UUID) -> None: ...
+
+    # Remove o bloqueio. Retorna False se o usuário não estava bloqueado.
+    @abstractmethod
+    def unblock(self, user_id: UUID, blocked_id: UUID) -> bool: ...
+
+    # Amigos em comum entre dois usuários.
+    @abstractmethod
+    def mutual_friends(self, user_id: UUID, other_id: UUID) -> set[UUID]: ...
+
+    # Amigos de amigos que ainda não são amigos (nem bloqueados) do usuário.
+    @abstractmethod
+    def friends_of_friends(self, user_id: UUID) -> set[UUID]: ...
+
+    # Lista todos os usuários na ordem de criação.
+    def list_all(self) -> list[Any]:
+        return list(self)
+
+
+# Repositório em memória com índices por id e por email normalizado.
+# Os índices são mantidos sincronizados em toda criação e atualização de senha.
+class InMemoryUserRepository(UserRepository):
+
+    def __init__(self) -> None:
+        self._by_id: dict[UUID, Any] = {}
+        self._id_by_email: dict[str, UUID] = {}
+        # Ids em ordem de criação. O cursor é a posição nesta lista.
+        self._order: list[UUID] = []
+        self.graph = FriendGraph()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, user: Any) -> Any:
+        email = normalize_email(user.email)
+        if email in self._id_by_email:
+            raise DuplicateEmailError(f"email already registered: {user.email}")
+        self._by_id[user.id] = user
+        self._id_by_email[email] = user.id
+        self._order.append(user.id)
+        return user
+
+    # Devolve o usuário com as listas de amigos e bloqueados lidas do grafo.
+    def _with_relations(self, user: Any) -> Any:
+        friends, blocked = self.graph.friends(user.id), self.graph.blocked(user.id)
+        if not friends and not blocked and not user.friends and not user.blocked:
+            return user
+        return user.model_copy(update={"friends": sorted(friends), "blocked": sorted(blocked)})
+
+    def exists(self, user_id: UUID) -> bool:
+        return user_id in self._by_id
+
+    def get(self, user_id: UUID, relations: bool = True) -> Any | None:
+        user = self._by_id.get(user_id)
+        if user is None or not relations:
+            return user
+        return self._with_relations(user)
+
+    def get_by_email(self, email: str, relations: bool = True) -> Any | None:
+        user_id = self._id_by_email.get(normalize_email(email))
+        if user_id is None:
+            return None
+        return self.get(user_id, relations)
+
+    # Substitui a instância armazenada. O email não muda, então o índice por email continua válido.
+    def update_password(
+        self, user_id: UUID, password_hash: str, password_salt: str, password_algorithm: str
+    ) -> Any | None:
+        user = self._by_id.get(user_id)
+        if user is None:
+            return None
+        updated_user = user.model_copy(
+            update={
+                "password_hash": password_hash,
+                "password_salt": password_salt,
+                "password_algorithm": password_algorithm,
+            }
+        )
+        self._by_id[user_id] = updated_user
+        return self._with_relations(updated_user)
+
+    def list_page(self, limit: int, cursor: int | None = None) -> tuple[list[Any], int | None]:
+        start = cursor or 0
+        end = start + limit
+        page = [self._with_relations(self._by_id[user_id]) for user_id in self._order[start:end]]
+        return page, end if end < len(self._order) else None
+
+    def clear(self) -> None:
+        self._by_id.clear()
+        self._id_by_email.clear()
+        self._order.clear()
+        self.graph.clear()
+
+    def friends(self, user_id: UUID) -> AbstractSet[UUID]:
+        return self.graph.friends(user_id)
+
+    def blocked(self, user_id: UUID) -> AbstractSet[UUID]:
+        return self.graph.blocked(user_id)
+
+    def are_friends(self, user_id: UUID, other_id: UUID) -> bool:
+        return self.graph.are_friends(user_id, other_id)
+
+    def add_friend(self, user_id: UUID, friend_id: UUID) -> None:
+        self.graph.add_friend(user_id, friend_id)
+
+    def remove_friend(self, user_id: UUID, friend_id: UUID) -> bool:
+        return self.graph.remove_friend(user_id, friend_id)
+
+    def block(self, user_id: UUID, blocked_id: UUID) -> None:
+        self.graph.block(user_id, blocked_id)
+
+    def unblock(self, user_id: UUID, blocked_id: UUID) -> bool:
+        return self.graph.unblock(user_id, blocked_id)
+
+    def mutual_friends(self, user_id: UUID, other_id: UUID) -> set[UUID]:
+        return self.graph.mutual_friends(user_id, other_id)
+
+    def friends_of_friends(self, user_id: UUID) -> set[UUID]:
+        return self.graph.friends_of_friends(user_id)
+
+
+
+
+# Repositório SQLite. Cada thread (e cada processo worker) usa a sua própria conexão,
+# reaproveitada entre requisições. Todas as instruções são parametrizadas e ficam no
+# cache de instruções preparadas da conexão (`cached_statements`).
+# Amizades e bloqueios ficam em tabelas próprias, com os ids em BLOB de 16 bytes.
+class SqliteUserRepository(UserRepository):
+
+    # Versões do esquema (PRAGMA user_version):
+    # 1: senha em `password_sha256`, amigos e bloqueados como listas JSON em `users`;
+    # 2: senha em `password_hash`, `password_salt` e `password_algorithm`;
+    # 3: amigos e bloqueados nas tabelas `friendships` e `blocks`.
+    # Bancos criados antes do versionamento têm user_version 0; a versão deles é deduzida
+    # pelas colunas de `users`.
+    SCHEMA_VERSION = 3
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            email TEXT NOT NULL,
+            email_normalized TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            password_salt TEXT NOT NULL DEFAULT '',
+            password_algorithm TEXT NOT NULL DEFAULT 'sha256',
+            signup_ts TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS friendships (
+            user_id BLOB NOT NULL,
+            friend_id BLOB NOT NULL,
+            PRIMARY KEY (user_id, friend_id)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS blocks (
+            user_id BLOB NOT NULL,
+            blocked_id BLOB NOT NULL,
+            PRIMARY KEY (user_id, blocked_id)
+        ) WITHOUT ROWID
+        """,
+    )
+    COLUMNS = "id, email, name, password_hash, password_salt, password_algorithm, signup_ts"
+    PAGE_COLUMNS = f"seq, {COLUMNS}"
+
+    INSERT = (
+        "INSERT INTO users (id, email, email_normalized, name, password_hash, password_salt, password_algorithm, "
+        "signup_ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    SELECT_BY_ID = f"SELECT {COLUMNS} FROM users WHERE id = ?"
+    EXISTS = "SELECT 1 FROM users WHERE id = ?"
+    EMAIL_EXISTS = "SELECT 1 FROM users WHERE email_normalized = ?"
+    SELECT_BY_EMAIL = f"SELECT {COLUMNS} FROM users WHERE email_normalized = ?"
+    SELECT_PAGE = f"SELECT {PAGE_COLUMNS} FROM users WHERE seq > ? ORDER BY seq LIMIT ?"
+    UPDATE_PASSWORD = "UPDATE users SET password_hash = ?, password_salt = ?, password_algorithm = ? WHERE id = ?"
+    COUNT = "SELECT COUNT(*) FROM users"
+    DELETE_ALL = ("DELETE FROM users", "DELETE FROM friendships", "DELETE FROM blocks")
+
+    SELECT_FRIENDS = "SELECT friend_id FROM friendships WHERE user_id = ?"
+    SELECT_BLOCKED = "SELECT blocked_id FROM blocks WHERE user_id = ?"
+    COUNT_FRIENDS = "SELECT COUNT(*) FROM friendships WHERE user_id = ?"
+    COUNT_BLOCKED = "SELECT COUNT(*) FROM blocks WHERE user_id = ?"
+    IS_FRIEND = "SELECT 1 FROM friendships WHERE user_id = ? AND friend_id = ?"
+    IS_BLOCKED = "SELECT 1 FROM blocks WHERE user_id = ? AND blocked_id = ?"
+    INSERT_FRIEND = "INSERT OR IGNORE INTO friendships (user_id, friend_id) VALUES (?, ?)"
+    DELETE_FRIEND = "DELETE FROM friendships WHERE user_id = ? AND friend_id = ?"
+    INSERT_BLOCK = "INSERT OR IGNORE INTO blocks (user_id, blocked_id) VALUES (?, ?)"
+    DELETE_BLOCK = "DELETE FROM blocks WHERE user_id = ? AND blocked_id = ?"
+    SELECT_MUTUAL = (
+        "SELECT a.friend_id FROM friendships a "
+        "JOIN friendships b ON b.user_id = ? AND b.friend_id = a.friend_id "
+        "WHERE a.user_id = ?"
+    )
+    SELECT_FRIENDS_OF_FRIENDS = (
+        "SELECT DISTINCT f2.friend_id FROM friendships f1 "
+        "JOIN friendships f2 ON f2.user_id = f1.friend_id "
+        "WHERE f1.user_id = :user_id AND f2.friend_id != :user_id "
+        "AND f2.friend_id NOT IN (SELECT friend_id FROM friendships WHERE user_id = :user_id) "
+        "AND f2.friend_id NOT IN (SELECT blocked_id FROM blocks WHERE user_id = :user_id)"
+    )
+
+    # path: caminho do arquivo do banco. Precisa ser um arquivo (não ":memory:"),
+    # pois cada thread abre a sua própria conexão.
+    # model_type: classe do modelo usada para reconstruir os usuários lidos do banco.
+    def __init__(self, path: str, model_type: type, timeout: float = 5.0) -> None:
+        self.path = path
+        self.model_type = model_type
+        self.timeout = timeout
+        self._local = threading.local()
+        self._migrate(self._connection())
+
+    # Cria o esquema num banco novo ou aplica as migrações pendentes. A transação IMMEDIATE
+    # impede que dois workers migrem o mesmo arquivo ao mesmo tempo.
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._schema_version(conn)
+            if version > self.SCHEMA_VERSION:
+                raise sqlite3.DatabaseError(
+                    f"{self.path} uses schema version {version}, newer than {self.SCHEMA_VERSION}"
+                )
+            if version == 0:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+            else:
+                for target in range(version + 1, self.SCHEMA_VERSION + 1):
+                    self.MIGRATIONS[target](self, conn)
+            conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    # Versão do esquema do banco; 0 se ainda não há tabela `users`.
+    def _schema_version(self, conn: sqlite3.Connection) -> int:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version:
+            return version
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+        if not columns:
+            return 0
+        if "password_sha256" in columns:
+            return 1
+        if "friends" in columns:
+            return 2
+        return 3
+
+    # 1 -> 2: o hash SHA256 antigo vira `password_hash`, com sal vazio e algoritmo "sha256",
+    # que o PasswordHasher continua verificando.
+    def _migrate_password_columns(self, conn: sqlite3.Connection) -> None:
+        conn.execute("ALTER TABLE users RENAME COLUMN password_sha256 TO password_hash")
+        conn.execute("ALTER TABLE users ADD COLUMN password_salt TEXT NOT NULL DEFAULT ''")
+        conn.execute("ALTER TABLE users ADD COLUMN password_algorithm TEXT NOT NULL DEFAULT 'sha256'")
+
+    # 2 -> 3: copia as listas JSON para as tabelas de relações e remove as colunas.
+    # A amizade é gravada nos dois sentidos, como em add_friend.
+    def _migrate_relation_tables(self, conn: sqlite3.Connection) -> None:
+        for statement in self.SCHEMA[1:]:
+            conn.execute(statement)
+        for user_id, friends, blocked in conn.execute("SELECT id, friends, blocked FROM users").fetchall():
+            one = UUID(user_id).bytes
+            for value in json.loads(friends):
+                other = UUID(value).bytes
+                conn.executemany(self.INSERT_FRIEND, ((one, other), (other, one)))
+            conn.executemany(self.INSERT_BLOCK, ((one, UUID(value).bytes) for value in json.loads(blocked)))
+        conn.execute("ALTER TABLE users DROP COLUMN friends")
+        conn.execute("ALTER TABLE users DROP COLUMN blocked")
+
+    # Migração que leva o banco a cada versão, a partir da anterior.
+    MIGRATIONS = {2: _migrate_password_columns, 3: _migrate_relation_tables}
+
+    # Conexão da thread atual, criada na primeira utilização.
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # Fecha a conexão da thread atual.
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _ids(self, query: str, params: tuple) -> set[UUID]:
+        return {UUID(bytes=row[0]) for row in self._connection().execute(query, params)}
+
+    # Lê as relações de vários usuários de uma vez (uma consulta por tabela).
+    def _relations(self, table: str, column: str, user_ids: list[UUID]) -> dict[UUID, list[UUID]]:
+        relations: dict[UUID, list[UUID]] = {user_id: [] for user_id in user_ids}
+        placeholders = ", ".join("?" * len(user_ids))
+        query = f"SELECT user_id, {column} FROM {table} WHERE user_id IN ({placeholders}) ORDER BY user_id, {column}"
+        for user_id, other_id in self._connection().execute(query, [user_id.bytes for user_id in user_ids]):
+            relations[UUID(bytes=user_id)].append(UUID(bytes=other_id))
+        return relations
+
+    # Converte linhas do banco em modelos, sem revalidar (os dados foram validados na escrita).
+    # Com relations=False, as tabelas de relações não são lidas e as listas ficam vazias.
+    def _to_models(self, rows: list[tuple], relations: bool = True) -> list[Any]:
+        if not rows:
+            return []
+        user_ids = [UUID(row[0]) for row in rows]
+        if relations:
+            friends = self._relations("friendships", "friend_id", user_ids)
+            blocked = self._relations("blocks", "blocked_id", user_ids)
+        else:
+            friends = blocked = {user_id: [] for user_id in user_ids}
+        models = []
+        for user_id, row in zip(user_ids, rows):
+            _, email, name, password_hash, password_salt, password_algorithm, signup_ts = row
+            models.append(
+                self.model_type.model_construct(
+                    id=user_id,
+                    email=email,
+                    name=name,
+                    password_hash=password_hash,
+                    password_salt=password_salt,
+                    password_algorithm=password_algorithm,
+                    friends=list(friends[user_id]),
+                    blocked=list(blocked[user_id]),
+                    signup_ts=datetime.fromisoformat(signup_ts) if signup_ts else None,
+                )
+            )
+        return models
+
+    def _to_row(self, user: Any) -> tuple:
+        return (
+            str(user.id),
+            user.email,
+            normalize_email(user.email),
+            user.name,
+            user.password_hash,
+            user.password_salt,
+            user.password_algorithm,
+            user.signup_ts.isoformat() if user.signup_ts else None,
+        )
+
+    def _get_one(self, query: str, params: tuple, relations: bool = True) -> Any | None:
+        row = self._connection().execute(query, params).fetchone()
+        return self._to_models([row], relations)[0] if row else None
+
+    def __len__(self) -> int:
+        return self._connection().execute(self.COUNT).fetchone()[0]
+
+    # Insere a linha do usuário. Só a violação do email único vira DuplicateEmailError;
+    # qualquer outra (ex.: id repetido) é propagada como está.
+    def _insert(self, conn: sqlite3.Connection, user: Any) -> None:
+        row = self._to_row(user)
+        try:
+            conn.execute(self.INSERT, row)
+        except sqlite3.IntegrityError as exc:
+            if conn.execute(self.EMAIL_EXISTS, (row[2],)).fetchone() is None:
+                raise
+            raise DuplicateEmailError(f"email already registered: {user.email}") from exc
+
+    def add(self, user: Any) -> Any:
+        conn = self._connection()
+        with conn:
+            self._insert(conn, user)
+        return user
+
+    # Todas as inserções ficam na mesma transação. Um email duplicado só descarta a
+    # própria linha, não o lote inteiro.
+    def add_many(self, users: list[Any]) -> list[int]:
+        rejected = []
+        conn = self._connection()
+        with conn:
+            for index, user in enumerate(users):
+                try:
+                    self._insert(conn, user)
+                except DuplicateEmailError:
+                    rejected.append(index)
+        return rejected
+
+    def exists(self, user_id: UUID) -> bool:
+        return self._connection().execute(self.EXISTS, (str(user_id),)).fetchone() is not None
+
+    def get(self, user_id: UUID, relations: bool = True) -> Any | None:
+        return self._get_one(self.SELECT_BY_ID, (str(user_id),), relations)
+
+    def get_by_email(self, email: str, relations: bool = True) -> Any | None:
+        return self._get_one(self.SELECT_BY_EMAIL, (normalize_email(email),), relations)
+
+    def update_password(
+        self, user_id: UUID, password_hash: str, password_salt: str, password_algorithm: str
+    ) -> Any | None:
+        conn = self._connection()
+        with conn:
+            updated = conn.execute(
+                self.UPDATE_PASSWORD, (password_hash, password_salt, password_algorithm, str(user_id))
+            ).rowcount
+        if not updated:
+            return None
+        return self.get(user_id)
+
+    # O cursor é o `seq` do último usuário devolvido (paginação por chave, usa a chave primária).
+    def list_page(self, limit: int, cursor: int | None = None) -> tuple[list[Any], int | None]:
+        rows = self._connection().execute(self.SELECT_PAGE, (cursor or 0, limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        page = self._to_models([row[1:] for row in rows])
+        return page, rows[-1][0] if has_more else None
+
+    def clear(self) -> None:
+        conn = self._connection()
+        with conn:
+            for statement in self.DELETE_ALL:
+                conn.execute(statement)
+
+    def friends(self, user_id: UUID) -> AbstractSet[UUID]:
+        return self._ids(self.SELECT_FRIENDS, (user_id.bytes,))
+
+    def blocked(self, user_id: UUID) -> AbstractSet[UUID]:
+        return self._ids(self.SELECT_BLOCKED, (user_id.bytes,))
+
+    def are_friends(self, user_id: UUID, other_id: UUID) -> bool:
+        return self._connection().execute(self.IS_FRIEND, (user_id.bytes, other_id.bytes)).fetchone() is not None
+
+    # As verificações e as inserções rodam numa transação IMMEDIATE, que já reserva a
+    # escrita e evita que outro worker ultrapasse o limite de amigos ao mesmo tempo.
+    def add_friend(self, user_id: UUID, friend_id: UUID) -> None:
+        conn = self._connection()
+        one, other = user_id.bytes, friend_id.bytes
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute(self.IS_FRIEND, (one, other)).fetchone():
+                return
+            if conn.execute(self.IS_BLOCKED, (one, other)).fetchone() or conn.execute(
+                self.IS_BLOCKED, (other, one)
+            ).fetchone():
+                raise BlockedError("users have blocked each other")
+            for key in (one, other):
+                if conn.execute(self.COUNT_FRIENDS, (key,)).fetchone()[0] >= MAX_FRIENDS:
+                    raise FriendLimitError(f"user {UUID(bytes=key)} already has {MAX_FRIENDS} friends")
+            conn.execute(self.INSERT_FRIEND, (one, other))
+            conn.execute(self.INSERT_FRIEND, (other, one))
+
+    def remove_friend(self, user_id: UUID, friend_id: UUID) -> bool:
+        conn = self._connection()
+        with conn:
+            removed = conn.execute(self.DELETE_FRIEND, (user_id.bytes, friend_id.bytes)).rowcount
+            conn.execute(self.DELETE_FRIEND, (friend_id.bytes, user_id.bytes))
+        return bool(removed)
+
+    def block(self, user_id: UUID, blocked_id: UUID) -> None:
+        conn = self._connection()
+        one, other = user_id.bytes, blocked_id.bytes
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if not conn.execute(self.IS_BLOCKED, (one, other)).fetchone():
+                if conn.execute(self.COUNT_BLOCKED, (one,)).fetchone()[0] >= MAX_FRIENDS:
+                    raise FriendLimitError(f"user {user_id} already blocked {MAX_FRIENDS} users")
+                conn.execute(self.INSERT_BLOCK, (one, other))
+            conn.execute(self.DELETE_FRIEND, (one, other))
+            conn.execute(self.DELETE_FRIEND, (other, one))
+
+    def unblock(self, user_id: UUID, blocked_id: UUID) -> bool:
+        conn = self._connection()
+        with conn:
+            removed = conn.execute(self.DELETE_BLOCK, (user_id.bytes, blocked_id.bytes)).rowcount
+        return bool(removed)
+
+    def mutual_friends(self, user_id: UUID, other_id: UUID) -> set[UUID]:
+        return self._ids(self.SELECT_MUTUAL, (other_id.bytes, user_id.bytes))
+
+    def friends_of_friends(self, user_id: UUID) -> set[UUID]:
+        return {
+            UUID(bytes=row[0])
+            for row in self._connection().execute(self.SELECT_FRIENDS_OF_FRIENDS, {"user_id": user_id.bytes})
+        }
+
+
+if __name__ == "__main__":
+    import hashlib
+    import os
+    import tempfile
+    from uuid import uuid4
+
+    from new import User, hasher
+
+    # Banco criado pela primeira versão do repositório (user_version 0, esquema 1).
+    V1_SCHEMA = """
+        CREATE TABLE users (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            email TEXT NOT NULL,
+            email_normalized TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            password_sha256 TEXT NOT NULL,
+            friends TEXT NOT NULL DEFAULT '[]',
+            blocked TEXT NOT NULL DEFAULT '[]',
+            signup_ts TEXT
+        )
+    """
+    ana, bob, eve = uuid4(), uuid4(), uuid4()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "users.db")
+        conn = sqlite3.connect(path)
+        conn.execute(V1_SCHEMA)
+        for user_id, name, friends, blocked in ((ana, "Ana", [bob], [eve]), (bob, "Bob", [], []), (eve, "Eve", [], [])):
+            conn.execute(
+                "INSERT INTO users (id, email, email_normalized, name, password_sha256, friends, blocked, signup_ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(user_id),
+                    f"{name}@test.com",
+                    f"{name.lower()}@test.com",
+                    name,
+                    hashlib.sha256(name.encode()).hexdigest(),
+                    json.dumps([str(value) for value in friends]),
+                    json.dumps([str(value) for value in blocked]),
+                    "2024-01-01T00:00:00",
+                ),
+            )
+        conn.commit()
+        conn.close()
+
+        repository = SqliteUserRepository(path, model_type=User)
+        user = repository.get(ana)
+        assert user.password_algorithm == "sha256" and hasher.verify("Ana", user), "legacy hashes must still verify"
+        assert user.friends == [bob] and user.blocked == [eve]
+        assert repository.are_friends(bob, ana), "migrated friendships must be symmetric"
+        conn = repository._connection()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SqliteUserRepository.SCHEMA_VERSION
+        assert "friends" not in {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+
+        # Depois da migração, o banco aceita usuários novos e reabrir não muda nada.
+        repository.add(User(name="Zoe", email="zoe@test.com", password_hash="zoe"))
+        repository.close()
+        repository = SqliteUserRepository(path, model_type=User)
+        assert len(repository) == 4 and repository.get(ana).friends == [bob]
+
+        # Só o email repetido vira DuplicateEmailError; um id repetido é outro erro.
+        try:
+            repository.add(User(name="Ana 2", email="ANA@test.com", password_hash="x"))
+        except DuplicateEmailError:
+            pass
+        else:
+            raise AssertionError("duplicate email should be rejected")
+        try:
+            repository.add(User(name="Ana 3", email="ana3@test.com", password_hash="x", id=ana))
+        except DuplicateEmailError:
+            raise AssertionError("a duplicate id is not a duplicate email")
+        except sqlite3.IntegrityError:
+            pass
+        assert repository.add_many([User(name="Bob 2", email="bob@test.com", password_hash="x")]) == [0]
+        repository.close()
+    print("user repository checks passed")
@@ -1,14 +1,23 @@
+import os
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 from uuid import uuid4
 
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.testclient import TestClient
 from pydantic import BaseModel, EmailStr, Field, field_serializer, UUID4
 
+from metrics import Metrics, instrument
+
 app = FastAPI()
 
+# Métricas de latência por rota e por fase, expostas em /metrics (opcional: METRICS_ENABLED=1).
+# metrics.py é uma cópia do módulo de mesmo nome em card3/new.
+metrics = Metrics(enabled=os.environ.get("METRICS_ENABLED") == "1")
+if metrics.enabled:
+    instrument(app, metrics)
+
 # Definindo o modelo de dados do usuário com FastAPI.
 class User(BaseModel):
 
@@ -40,11 +49,39 @@ class User(BaseModel):
     def serialize_id(self, id: UUID4) -> str:
         return str(id)
 
+# Tamanho da página quando só o cursor é informado.
+DEFAULT_PAGE_SIZE = 100
+
+
+# Serializa usuários um a um em NDJSON, sem montar o documento JSON inteiro em memória.
+def iter_users_ndjson():
+    for user in list(User.__users__):
+        yield user.model_dump_json() + "\n"
+
+
 # Endpoint para listar todos os usuários. Aqui foi utilizado o response_model para indicar o modelo de dados que será retornado pelo endpoint.
 # O retorno obedecerá ao modelo de dados definido no response_model, com somente os campos que foram definidos no modelo de dados.
+# A listagem é paginada: limit define o tamanho da página e cursor a posição inicial na lista.
+# O cursor da próxima página vai no header X-Next-Cursor (ausente na última página).
+# Sem limit nem cursor, devolve todos os usuários, como antes da paginação.
+# Com format=ndjson, todos os usuários são exportados em streaming, um por linha.
 @app.get("/users", response_model=list[User])
-async def get_users() -> list[User]:
-    return list(User.__users__)
+async def get_users(
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: int | None = Query(None, ge=0),
+    format: Literal["json", "ndjson"] = "json",
+) -> list[User] | StreamingResponse:
+    if format == "ndjson":
+        return StreamingResponse(iter_users_ndjson(), media_type="application/x-ndjson")
+    if limit is None and cursor is None:
+        return User.__users__
+
+    cursor = cursor or 0
+    end = cursor + (limit or DEFAULT_PAGE_SIZE)
+    if end < len(User.__users__):
+        response.headers["X-Next-Cursor"] = str(end)
+    return User.__users__[cursor:end]
 
 # Endpoint para criar um novo usuário. Aqui foi utilizado o response_model para indicar o modelo de dados que será retornado pelo endpoint.
 # O retorno obedecerá ao modelo de dados definido no response_model, com somente os campos que foram definidos no modelo de dados. O tipo de 
@@ -93,6 +130,19 @@ def main() -> None:
         assert response.status_code == 200, "Response code should be 200"
         assert len(response.json()) == 5, "There should be 5 users"
 
+        response = client.get("/users", params={"limit": 3})
+        assert len(response.json()) == 3, "The first page should have 3 users"
+        response = client.get("/users", params={"limit": 3, "cursor": response.headers["X-Next-Cursor"]})
+        assert len(response.json()) == 2, "The last page should have 2 users"
+        assert "X-Next-Cursor" not in response.headers, "The last page should not have a next cursor"
+
+        # Exportação em NDJSON: um usuário por linha
+        response = client.get("/users", params={"format": "ndjson"})
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert [User.model_validate_json(line).name for line in response.text.splitlines()] == [
+            f"User {i}" for i in range(5)
+        ], "NDJSON export should contain every user"
+
         response = client.post(
             "/users", json={"name": "User 5", "email": "example5@arjancodes.com"}
         )
@@ -123,6 +173,28 @@ def main() -> None:
         response = client.post("/users", json={"name": "User 6", "email": "wrong"})
         assert response.status_code == 422, "The email address is should be invalid"
 
+        # Sem limit nem cursor, a lista não é truncada no tamanho da página
+        for i in range(DEFAULT_PAGE_SIZE):
+            client.post("/users", json={"name": f"Extra {i}", "email": f"extra{i}@arjancodes.com"})
+        response = client.get("/users")
+        assert len(response.json()) == len(User.__users__) > DEFAULT_PAGE_SIZE, "Every user should be returned"
+        assert "X-Next-Cursor" not in response.headers
+        response = client.get("/users", params={"cursor": 0})
+        assert len(response.json()) == DEFAULT_PAGE_SIZE and response.headers["X-Next-Cursor"] == str(DEFAULT_PAGE_SIZE)
+
+        # --- Testes de métricas (somente com METRICS_ENABLED=1) ---
+        if metrics.enabled:
+            response = client.get("/metrics")
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/plain")
+            text = response.text
+            assert 'http_request_duration_seconds_count{method="POST",route="/users",status="200"}' in text
+            assert 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}",status="404"}' in text
+            for phase in ("validation", "handler", "serialization"):
+                assert f'http_request_phase_seconds_count{{method="POST",route="/users",phase="{phase}"}}' in text
+            invalid = metrics.histogram("http_request_duration_seconds", method="POST", route="/users", status="422")
+            assert invalid.count == 1, "Validation errors should be counted with their status"
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file